@@ -0,0 +1,19 @@
+"""
+Script to create asset lookup indexes on an existing database
+"""
+from src.database.database import engine
+from src.database.models import Asset
+
+def create_asset_indexes():
+    """Create indexes declared on the Asset table that don't exist yet"""
+    print("Creating asset indexes...")
+
+    for index in Asset.__table__.indexes:
+        # Declared on the model; existing tables don't get new indexes from create_all
+        index.create(engine, checkfirst=True)
+        print(f"  - {index.name}")
+
+    print("✅ Asset indexes created successfully!")
+
+if __name__ == "__main__":
+    create_asset_indexes()
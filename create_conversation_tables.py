@@ -3,30 +3,54 @@ Script to create/update conversation thread tables in the database
 """
 from src.database.database import engine, Base
 from src.database.models import ConversationThread, ConversationMessage
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 
 def create_conversation_tables():
     """Create or update ConversationThread and ConversationMessage tables"""
     print("Creating/updating conversation tables...")
-    
+
+    tables = [ConversationThread.__table__, ConversationMessage.__table__]
+    existing_tables = set(inspect(engine).get_table_names())
+
+    # Create tables that don't exist yet; existing tables and their data are kept
+    Base.metadata.create_all(engine, tables=tables)
+
+    # Add columns introduced after the tables were first created (e.g. context_data)
     inspector = inspect(engine)
-    
-    # Drop existing tables if they exist (for migration)
-    if inspector.has_table("ConversationMessage"):
-        print("  - Dropping old ConversationMessage table...")
-        ConversationMessage.__table__.drop(engine)
-    
-    if inspector.has_table("ConversationThread"):
-        print("  - Dropping old ConversationThread table...")
-        ConversationThread.__table__.drop(engine)
-    
-    # Create tables with new schema
-    ConversationThread.__table__.create(engine, checkfirst=True)
-    ConversationMessage.__table__.create(engine, checkfirst=True)
-    
-    print("✅ Conversation tables created successfully!")
-    print("   - ConversationThread")
-    print("   - ConversationMessage (with context_data column)")
+    added_columns = []
+    skipped_columns = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+
+            if not column.nullable:
+                skipped_columns.append(f"{table.name}.{column.name}")
+                continue
+
+            print(f"  - Adding {column.name} column to {table.name}...")
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {column.name} {column_type}'))
+            added_columns.append(f"{table.name}.{column.name}")
+
+    for name in skipped_columns:
+        print(f"⚠ Cannot add NOT NULL column {name} without a default; migrate manually")
+
+    if skipped_columns:
+        print(f"⚠ Conversation tables updated; {len(skipped_columns)} column(s) still missing")
+    else:
+        print("✅ Conversation tables are up to date")
+    for table in tables:
+        status = "existing" if table.name in existing_tables else "created"
+        print(f"   - {table.name} ({status})")
+    for name in added_columns:
+        print(f"   - Added column {name}")
 
 if __name__ == "__main__":
     create_conversation_tables()
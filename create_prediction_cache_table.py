@@ -0,0 +1,17 @@
+"""
+Script to create the churn prediction cache table in the database
+"""
+from src.database.database import engine, Base
+from src.database.models import ChurnPrediction
+
+def create_prediction_cache_table():
+    """Create the Churn_Prediction table if it doesn't exist yet"""
+    print("Creating churn prediction cache table...")
+
+    # Existing table and its cached predictions are kept
+    Base.metadata.create_all(engine, tables=[ChurnPrediction.__table__])
+
+    print("✅ Churn_Prediction table created successfully!")
+
+if __name__ == "__main__":
+    create_prediction_cache_table()
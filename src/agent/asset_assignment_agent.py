@@ -3,22 +3,205 @@ Employee Lifecycle Agent for handling both onboarding (asset assignment) and off
 Uses LangChain with Google Gemini 2.0 Flash model
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
+import threading
+import orjson
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from functools import lru_cache, partial
+from typing import Dict, Any, List, Optional, Union
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session, sessionmaker
 from datetime import datetime, timedelta
-from langchain.agents import Tool, initialize_agent, AgentType
+from langchain.agents import Tool, AgentExecutor, create_tool_calling_agent
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain.llms.base import LLM
 from langchain_google_genai import ChatGoogleGenerativeAI
 from src.config import settings
-from src.agent.tool.tools import EmployeeLifecycleTools
+from src.agent.tool.tools import EmployeeLifecycleTools, asset_data_version
 from src.agent.tool.churn_prediction_tools import ChurnPredictionTools
 from src.agent.tool.procurement_forecasting_tools import ProcurementForecastingTools
 from src.email_service import EmailService
 
 logger = logging.getLogger(__name__)
 
+# Max employees processed at once by the batch methods
+BATCH_MAX_CONCURRENCY = 8
+
+# Session read by the agent tools; a ContextVar so concurrent batch runs each see their own
+_db_session_var: ContextVar[Optional[Session]] = ContextVar("db_session", default=None)
+
+
+def _session_factory(db: Session) -> sessionmaker:
+    """Build a session factory bound to the same engine as an existing session"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+
+# Asset health results shared by track_asset_health and get_asset_health_report;
+# keys include the database and the asset data version so asset writes start fresh entries
+HEALTH_CACHE_TTL_SECONDS = 60
+_health_cache = TTLCache(maxsize=32, ttl=HEALTH_CACHE_TTL_SECONDS)
+_health_cache_lock = threading.Lock()
+
+
+def _health_key(kind: str, db: Session, *args) -> tuple:
+    """Cache key for an asset health lookup"""
+    return hashkey(str(db.get_bind().url), kind, *args, asset_data_version())
+
+
+@cached(_health_cache, key=lambda db, age_threshold_years: _health_key("refresh", db, age_threshold_years), lock=_health_cache_lock)
+def _assets_for_refresh_entry(db: Session, age_threshold_years: int) -> Dict[str, Any]:
+    """Assets due for refresh as stored in the health cache"""
+    return EmployeeLifecycleTools.get_assets_for_refresh(db, age_threshold_years)
+
+
+def _cached_assets_for_refresh(db: Session, age_threshold_years: int) -> Dict[str, Any]:
+    """Assets due for refresh, memoized per threshold for a short TTL; returns a copy"""
+    result = dict(_assets_for_refresh_entry(db, age_threshold_years))
+    if "assets_for_refresh" in result:
+        result["assets_for_refresh"] = list(result["assets_for_refresh"])
+    return result
+
+
+@cached(_health_cache, key=lambda db: _health_key("summary", db), lock=_health_cache_lock)
+def _health_summary_entry(db: Session) -> Dict[str, Any]:
+    """Asset health summary as stored in the health cache"""
+    return EmployeeLifecycleTools.get_asset_health_summary(db)
+
+
+def _cached_health_summary(db: Session) -> Dict[str, Any]:
+    """Asset health summary, memoized for a short TTL; returns a copy"""
+    return dict(_health_summary_entry(db))
+
+
+# Tool descriptions shown to the LLM; the tool set is static so these are built once
+TOOL_DESCRIPTIONS = {
+    "get_asset_requirements": "Get asset requirements for an employee based on their role and department. Input should be employee_id",
+    "find_available_assets": "Find available assets of a specific type. Input should be JSON: {\"device_type\": \"laptop\", \"quantity\": 1}",
+    "assign_asset": "Assign an asset to an employee. Input should be JSON: {\"employee_id\": 1, \"asset_id\": 5}",
+    "get_assignment_summary": "Get summary of assets currently assigned to an employee. Input should be employee_id",
+    "get_employee_assets": "Get all assets held by an employee. Input should be employee_id",
+    "get_manager_info": "Get manager information. Input should be manager_id",
+    "schedule_asset_returns": "Schedule asset returns for an employee. Input should be JSON: {\"employee_id\": 1, \"return_due_date\": \"2025-01-22\"}",
+    "get_resignation_summary": "Get resignation and asset recovery summary for an employee. Input should be employee_id",
+    "batch_tool_calls": "Run several independent tool calls at once. Input should be JSON: "
+                        "{\"invocations\": [{\"tool\": \"find_available_assets\", \"input\": {\"device_type\": \"laptop\", \"quantity\": 1}}]}"
+}
+
+
+# Onboarding task given to the agent; only the employee ID varies
+ONBOARD_TEMPLATE = """
+            A new employee with ID {employee_id} has been onboarded. 
+            
+            Your task is to:
+            1. Get the asset requirements for this employee based on their role and department
+            2. Find available assets that match their requirements (prioritize: excellent > good > fair condition)
+            3. Assign all required assets to the employee
+            4. Return a summary of the assignment
+            
+            Important:
+            - Assign assets matching the quantity required for their role/department
+            - Prioritize assets in better condition when multiple are available
+            - Make sure each asset is successfully assigned before moving to the next one
+            - Return a clear summary of what was assigned and any failures
+            """
+
+# Display format for dates in recovery emails
+_fmt = "%B %d, %Y"
+
+
+@lru_cache(maxsize=512)
+def _iso_to_pretty(s: str) -> str:
+    """Format an ISO date string for display, e.g. 2025-01-22 -> January 22, 2025"""
+    return datetime.fromisoformat(s).strftime(_fmt)
+
+
+# Fields the LLM never uses; dropped from tool results to save prompt tokens
+_LLM_NOISY_KEYS = frozenset({"serial_number", "condition_notes", "notes", "description"})
+
+
+def _strip_for_llm(obj: Any) -> Any:
+    """Recursively drop noisy keys from a tool result before it goes to the LLM"""
+    if isinstance(obj, dict):
+        return {k: _strip_for_llm(v) for k, v in obj.items() if k not in _LLM_NOISY_KEYS}
+    if isinstance(obj, list):
+        return [_strip_for_llm(v) for v in obj]
+    return obj
+
+
+@cached(_health_cache, key=lambda db, age_threshold_years: _health_key("refresh_counts", db, age_threshold_years), lock=_health_cache_lock)
+def _refresh_counts_entry(db: Session, age_threshold_years: int) -> Dict[str, Any]:
+    """Refresh counts as stored in the health cache"""
+    return EmployeeLifecycleTools.get_refresh_counts(db, age_threshold_years)
+
+
+def _cached_refresh_counts(db: Session, age_threshold_years: int) -> Dict[str, Any]:
+    """Refresh counts aggregated in SQL, memoized per threshold for a short TTL; returns a copy"""
+    return dict(_refresh_counts_entry(db, age_threshold_years))
+
+
+class _FindAssetsArgs(BaseModel):
+    device_type: str
+    quantity: int
+
+
+class _AssignAssetArgs(BaseModel):
+    employee_id: int
+    asset_id: int
+
+
+class _ScheduleReturnsArgs(BaseModel):
+    employee_id: int
+    return_due_date: str
+
+
+@lru_cache(maxsize=256)
+def _parse_tool_args_json(model, input_str):
+    """Validate a JSON tool input string; memoized since agents repeat identical calls"""
+    try:
+        return model.model_validate_json(input_str), None
+    except ValidationError as e:
+        return None, {"error": str(e)}
+
+
+def _parse_tool_args(model, input_str):
+    """
+    Validate JSON tool input against an argument model
+    
+    Args:
+        model: Pydantic model describing the tool arguments
+        input_str: JSON string (or already-parsed dict) from the agent
+        
+    Returns:
+        Tuple of (parsed args, None) or (None, error dict)
+    """
+    if isinstance(input_str, (str, bytes)):
+        return _parse_tool_args_json(model, input_str)
+    try:
+        return model.model_validate(input_str), None
+    except ValidationError as e:
+        return None, {"error": str(e)}
+
+
+async def _run_in_new_session(session_factory: sessionmaker, func, *args):
+    """Run a blocking query function in a worker thread with its own session"""
+    def _call():
+        worker_db = session_factory()
+        try:
+            return func(worker_db, *args)
+        finally:
+            worker_db.close()
+    
+    return await asyncio.to_thread(_call)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result to the JSON string LangChain expects"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
 
 class EmployeeLifecycleAgent:
     """AI Agent for managing employee lifecycle (onboarding and offboarding)"""
@@ -27,8 +210,19 @@ class EmployeeLifecycleAgent:
         """Initialize the agent with LangChain tools"""
         self.tools = self._setup_tools()
         self.llm = None
+        self._agent_executor = None
+        self._onboard_prompt = PromptTemplate.from_template(ONBOARD_TEMPLATE)
         self._initialize_llm()
     
+    @property
+    def db_session(self) -> Optional[Session]:
+        """Database session used by the agent tools in the current context"""
+        return _db_session_var.get()
+    
+    @db_session.setter
+    def db_session(self, db: Optional[Session]):
+        _db_session_var.set(db)
+    
     def _initialize_llm(self):
         """Initialize the Google Gemini LLM"""
         if not settings.google_api_key:
@@ -39,111 +233,150 @@ class EmployeeLifecycleAgent:
             self.llm = ChatGoogleGenerativeAI(
                 model=settings.gemini_model,
                 google_api_key=settings.google_api_key,
-                temperature=0.7,
+                # Tool calls only need short, deterministic output
+                temperature=0.2,
+                max_output_tokens=512,
                 convert_system_message_to_human=True
             )
+            
+            # Build the agent once; tools read self.db_session at call time.
+            # Tool calling lets Gemini request several independent tools in one turn.
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", "You are an IT asset management assistant. Use the tools to complete the task. "
+                           "When several tool calls are independent, request them together or use batch_tool_calls."),
+                ("human", "{input}"),
+                ("placeholder", "{agent_scratchpad}")
+            ])
+            agent = create_tool_calling_agent(self.llm, self.tools, prompt)
+            self._agent_executor = AgentExecutor(
+                agent=agent,
+                tools=self.tools,
+                verbose=False,
+                handle_parsing_errors=True,
+                max_iterations=5
+            )
         except Exception as e:
             logger.error(f"Failed to initialize Gemini LLM: {e}")
             self.llm = None
+            self._agent_executor = None
     
     def _setup_tools(self) -> list:
         """Setup the tools for the agent"""
-        tools = [
-            Tool(
-                name="get_asset_requirements",
-                func=lambda emp_id: json.dumps(
-                    EmployeeLifecycleTools.get_asset_requirements(int(emp_id), self.db_session)
-                ),
-                description="Get asset requirements for an employee based on their role and department. Input should be employee_id"
-            ),
-            Tool(
-                name="find_available_assets",
-                func=lambda input_str: json.dumps(
-                    self._parse_and_find_assets(input_str)
-                ),
-                description="Find available assets of a specific type. Input should be JSON: {\"device_type\": \"laptop\", \"quantity\": 1}"
-            ),
-            Tool(
-                name="assign_asset",
-                func=lambda input_str: json.dumps(
-                    self._parse_and_assign_asset(input_str)
-                ),
-                description="Assign an asset to an employee. Input should be JSON: {\"employee_id\": 1, \"asset_id\": 5}"
-            ),
-            Tool(
-                name="get_assignment_summary",
-                func=lambda emp_id: json.dumps(
-                    EmployeeLifecycleTools.get_assignment_summary(int(emp_id), self.db_session)
-                ),
-                description="Get summary of assets currently assigned to an employee. Input should be employee_id"
-            ),
+        # Input parsers/dispatchers; each returns the tool result as a dict
+        self._tool_handlers = {
+            "get_asset_requirements": partial(self._call_with_id, EmployeeLifecycleTools.get_asset_requirements),
+            "find_available_assets": self._parse_and_find_assets,
+            "assign_asset": self._parse_and_assign_asset,
+            "get_assignment_summary": partial(self._call_with_id, EmployeeLifecycleTools.get_assignment_summary),
             # Recovery tools
+            "get_employee_assets": partial(self._call_with_id, EmployeeLifecycleTools.get_employee_assets),
+            "get_manager_info": partial(self._call_with_id, EmployeeLifecycleTools.get_manager_info),
+            "schedule_asset_returns": self._parse_and_schedule_returns,
+            "get_resignation_summary": partial(self._call_with_id, EmployeeLifecycleTools.get_resignation_summary),
+            "batch_tool_calls": self._run_batch_tool_calls
+        }
+        
+        tools = [
             Tool(
-                name="get_employee_assets",
-                func=lambda emp_id: json.dumps(
-                    EmployeeLifecycleTools.get_employee_assets(int(emp_id), self.db_session)
-                ),
-                description="Get all assets held by an employee. Input should be employee_id"
-            ),
-            Tool(
-                name="get_manager_info",
-                func=lambda mgr_id: json.dumps(
-                    EmployeeLifecycleTools.get_manager_info(int(mgr_id), self.db_session)
-                ),
-                description="Get manager information. Input should be manager_id"
-            ),
-            Tool(
-                name="schedule_asset_returns",
-                func=lambda input_str: json.dumps(
-                    self._parse_and_schedule_returns(input_str)
-                ),
-                description="Schedule asset returns for an employee. Input should be JSON: {\"employee_id\": 1, \"return_due_date\": \"2025-01-22\"}"
-            ),
-            Tool(
-                name="get_resignation_summary",
-                func=lambda emp_id: json.dumps(
-                    EmployeeLifecycleTools.get_resignation_summary(int(emp_id), self.db_session)
-                ),
-                description="Get resignation and asset recovery summary for an employee. Input should be employee_id"
+                name=name,
+                func=partial(self._tool_impl, key=name),
+                description=TOOL_DESCRIPTIONS[name]
             )
+            for name in self._tool_handlers
         ]
         return tools
     
-    def _parse_and_find_assets(self, input_str: str) -> Dict[str, Any]:
-        """Parse input and find assets"""
-        try:
-            data = json.loads(input_str) if isinstance(input_str, str) else input_str
-            return EmployeeLifecycleTools.find_available_assets(
-                data["device_type"],
-                data["quantity"],
-                self.db_session
+    def _tool_impl(self, input_str: str, key: str) -> str:
+        """Run the tool registered under key and serialize its result"""
+        return _dumps(_strip_for_llm(self._tool_handlers[key](input_str)))
+    
+    def _call_with_id(self, func, raw_id: Union[str, int, Dict[str, Any]]) -> Dict[str, Any]:
+        """Call a tool function that takes a single ID argument (plain or as {"employee_id": ...})"""
+        if isinstance(raw_id, dict):
+            raw_id = next(
+                (raw_id[key] for key in ("employee_id", "manager_id", "id") if raw_id.get(key) is not None),
+                None
             )
+            if raw_id is None:
+                return {"error": "Missing employee_id"}
+        return func(int(raw_id), self.db_session)
+    
+    def _run_batch_tool_calls(self, input_str: str) -> Dict[str, Any]:
+        """Parse a list of tool invocations and run them concurrently"""
+        try:
+            data = orjson.loads(input_str) if isinstance(input_str, str) else input_str
+            invocations = data["invocations"]
+            if not invocations:
+                return {"success": True, "results": []}
+            
+            if self.db_session is None:
+                return {"error": "No database session available"}
+            session_factory = _session_factory(self.db_session)
+            
+            def _invoke(invocation: Dict[str, Any]) -> Dict[str, Any]:
+                name = invocation.get("tool")
+                handler = self._tool_handlers.get(name)
+                if handler is None or name == "batch_tool_calls":
+                    return {"tool": name, "error": f"Unknown tool {name}"}
+                
+                tool_input = invocation.get("input", "")
+                if not isinstance(tool_input, (str, dict)):
+                    tool_input = str(tool_input)
+                
+                # Each invocation gets its own session; runs inside a copied context
+                worker_db = session_factory()
+                self.db_session = worker_db
+                try:
+                    return {"tool": name, "output": handler(tool_input)}
+                except Exception as e:
+                    # One failed invocation must not hide the results of the others
+                    worker_db.rollback()
+                    return {"tool": name, "error": str(e)}
+                finally:
+                    worker_db.close()
+            
+            with ThreadPoolExecutor(max_workers=min(8, len(invocations))) as executor:
+                results = list(executor.map(
+                    lambda invocation: copy_context().run(_invoke, invocation),
+                    invocations
+                ))
+            
+            return {"success": True, "results": results}
         except Exception as e:
             return {"error": str(e)}
     
+    def _parse_and_find_assets(self, input_str: str) -> Dict[str, Any]:
+        """Parse input and find assets"""
+        args, error = _parse_tool_args(_FindAssetsArgs, input_str)
+        if error:
+            return error
+        return EmployeeLifecycleTools.find_available_assets(
+            args.device_type,
+            args.quantity,
+            self.db_session
+        )
+    
     def _parse_and_assign_asset(self, input_str: str) -> Dict[str, Any]:
         """Parse input and assign asset"""
-        try:
-            data = json.loads(input_str) if isinstance(input_str, str) else input_str
-            return EmployeeLifecycleTools.assign_asset_to_employee(
-                int(data["employee_id"]),
-                int(data["asset_id"]),
-                self.db_session
-            )
-        except Exception as e:
-            return {"error": str(e)}
+        args, error = _parse_tool_args(_AssignAssetArgs, input_str)
+        if error:
+            return error
+        return EmployeeLifecycleTools.assign_asset_to_employee(
+            args.employee_id,
+            args.asset_id,
+            self.db_session
+        )
     
     def _parse_and_schedule_returns(self, input_str: str) -> Dict[str, Any]:
         """Parse input and schedule asset returns"""
-        try:
-            data = json.loads(input_str) if isinstance(input_str, str) else input_str
-            return EmployeeLifecycleTools.schedule_asset_returns(
-                int(data["employee_id"]),
-                data["return_due_date"],
-                self.db_session
-            )
-        except Exception as e:
-            return {"error": str(e)}
+        args, error = _parse_tool_args(_ScheduleReturnsArgs, input_str)
+        if error:
+            return error
+        return EmployeeLifecycleTools.schedule_asset_returns(
+            args.employee_id,
+            args.return_due_date,
+            self.db_session
+        )
     
     def assign_assets_to_employee(self, employee_id: int, db: Session) -> Dict[str, Any]:
         """
@@ -160,37 +393,16 @@ class EmployeeLifecycleAgent:
         
         try:
             # If no LLM is configured, use fallback logic
-            if not self.llm or not settings.google_api_key:
+            if not self._agent_executor or not settings.google_api_key:
                 return self._fallback_asset_assignment(employee_id, db)
             
-            # Initialize the agent
-            agent = initialize_agent(
-                self.tools,
-                self.llm,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=False,
-                handle_parsing_errors=True,
-                max_iterations=10
-            )
+            # Reuse the agent built in _initialize_llm
+            agent = self._agent_executor
             
             # Create the prompt for the agent
-            prompt = f"""
-            A new employee with ID {employee_id} has been onboarded. 
-            
-            Your task is to:
-            1. Get the asset requirements for this employee based on their role and department
-            2. Find available assets that match their requirements (prioritize: excellent > good > fair condition)
-            3. Assign all required assets to the employee
-            4. Return a summary of the assignment
+            prompt = self._onboard_prompt.format(employee_id=employee_id)
             
-            Important:
-            - Assign assets matching the quantity required for their role/department
-            - Prioritize assets in better condition when multiple are available
-            - Make sure each asset is successfully assigned before moving to the next one
-            - Return a clear summary of what was assigned and any failures
-            """
-            
-            result = agent.run(prompt)
+            result = agent.invoke({"input": prompt})["output"]
             
             # Get the final summary
             summary = EmployeeLifecycleTools.get_assignment_summary(employee_id, db)
@@ -207,8 +419,59 @@ class EmployeeLifecycleAgent:
             # Fallback to deterministic assignment
             return self._fallback_asset_assignment(employee_id, db)
     
+    async def assign_assets_to_employees_async(
+        self,
+        employee_ids: List[int],
+        db: Session
+    ) -> List[Dict[str, Any]]:
+        """
+        Assign assets to several new employees concurrently
+        
+        Args:
+            employee_ids: IDs of the newly onboarded employees
+            db: Database session (its engine is used for per-employee sessions)
+            
+        Returns:
+            List of assignment results, in the same order as employee_ids
+        """
+        session_factory = _session_factory(db)
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        use_agent = bool(self._agent_executor and settings.google_api_key)
+        prompts = [self._onboard_prompt.format(employee_id=emp_id) for emp_id in employee_ids]
+        
+        async def _single(employee_id: int, prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                worker_db = session_factory()
+                # Each task runs in its own context, so tools see this task's session
+                self.db_session = worker_db
+                try:
+                    if use_agent:
+                        try:
+                            result = await self._agent_executor.ainvoke({"input": prompt})
+                            summary = await asyncio.to_thread(
+                                EmployeeLifecycleTools.get_assignment_summary, employee_id, worker_db
+                            )
+                            return {
+                                "success": True,
+                                "agent_output": result.get("output"),
+                                "assignment_summary": summary,
+                                "message": f"Assets successfully assigned to employee {employee_id}"
+                            }
+                        except Exception as e:
+                            logger.error(f"Agent error for employee {employee_id}: {e}")
+                    
+                    return await asyncio.to_thread(
+                        self._fallback_asset_assignment, employee_id, worker_db
+                    )
+                finally:
+                    worker_db.close()
+        
+        return await asyncio.gather(*map(_single, employee_ids, prompts))
+    
     def _fallback_asset_assignment(self, employee_id: int, db: Session) -> Dict[str, Any]:
-        """Fallback deterministic asset assignment when LLM is not available"""
+        """
+        Fallback deterministic asset assignment when LLM is not available
+        """
         logger.info("Using fallback asset assignment (LLM not available)")
         
         # Get requirements
@@ -220,34 +483,55 @@ class EmployeeLifecycleAgent:
         assignments = []
         failed_assignments = []
         
-        # Assign each required asset type
-        for req in requirements["assets_needed"]:
+        # Sessions are not thread-safe, so each worker opens its own on the same engine
+        session_factory = _session_factory(db)
+        
+        def _process_req(req: Dict[str, Any]):
             device_type = req["type"]
             quantity = req["quantity"]
+            req_assignments = []
+            req_failed = []
             
-            # Find available assets
-            available = EmployeeLifecycleTools.find_available_assets(device_type, quantity, db)
-            
-            if available["available_count"] < quantity:
-                failed_assignments.append({
-                    "device_type": device_type,
-                    "required": quantity,
-                    "available": available["available_count"],
-                    "message": f"Insufficient {device_type}s: need {quantity}, found {available['available_count']}"
-                })
-            
-            # Assign available assets
-            for asset in available["assets"]:
-                result = EmployeeLifecycleTools.assign_asset_to_employee(
+            worker_db = session_factory()
+            try:
+                # Find available assets
+                available = EmployeeLifecycleTools.find_available_assets(device_type, quantity, worker_db)
+                
+                if available["available_count"] < quantity:
+                    req_failed.append({
+                        "device_type": device_type,
+                        "required": quantity,
+                        "available": available["available_count"],
+                        "message": f"Insufficient {device_type}s: need {quantity}, found {available['available_count']}"
+                    })
+                
+                # Assign all available assets of this type in one statement
+                result = EmployeeLifecycleTools.bulk_assign_assets(
                     employee_id,
-                    asset["asset_id"],
-                    db
+                    [asset["asset_id"] for asset in available["assets"]],
+                    worker_db
                 )
                 
-                if result["success"]:
-                    assignments.append(result)
+                if "error" in result:
+                    req_failed.append(result)
                 else:
-                    failed_assignments.append(result)
+                    req_assignments.extend(result["assigned"])
+                    req_failed.extend(result["failed"])
+            finally:
+                worker_db.close()
+            
+            return req_assignments, req_failed
+        
+        # Assign each required asset type in parallel, one worker per type
+        reqs = requirements["assets_needed"]
+        if reqs:
+            with ThreadPoolExecutor(max_workers=min(8, len(reqs))) as executor:
+                for req_assignments, req_failed in executor.map(_process_req, reqs):
+                    assignments.extend(req_assignments)
+                    failed_assignments.extend(req_failed)
+        
+        # Workers committed through their own sessions, so drop any stale state
+        db.expire_all()
         
         # Get final summary
         summary = EmployeeLifecycleTools.get_assignment_summary(employee_id, db)
@@ -257,7 +541,8 @@ class EmployeeLifecycleAgent:
             "assignment_summary": summary,
             "assignments_completed": len(assignments),
             "failed_assignments": failed_assignments,
-            "message": f"Asset assignment completed for employee {employee_id}. {len(assignments)} assets assigned, {len(failed_assignments)} failed."
+            "message": f"Asset assignment completed for employee {employee_id}. "
+                      f"{len(assignments)} assets assigned, {len(failed_assignments)} failed."
         }
     
     def process_resignation(
@@ -366,6 +651,38 @@ class EmployeeLifecycleAgent:
                 "error": str(e)
             }
     
+    async def process_resignations_async(
+        self,
+        employee_ids: List[int],
+        db: Session,
+        return_days: int = 7
+    ) -> List[Dict[str, Any]]:
+        """
+        Process several resignations concurrently
+        
+        Args:
+            employee_ids: IDs of resigning employees
+            db: Database session (its engine is used for per-employee sessions)
+            return_days: Days until return due (default 7)
+            
+        Returns:
+            List of recovery results, in the same order as employee_ids
+        """
+        session_factory = _session_factory(db)
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        
+        async def _single(employee_id: int) -> Dict[str, Any]:
+            async with semaphore:
+                worker_db = session_factory()
+                try:
+                    return await asyncio.to_thread(
+                        self.process_resignation, employee_id, worker_db, return_days
+                    )
+                finally:
+                    worker_db.close()
+        
+        return await asyncio.gather(*map(_single, employee_ids))
+    
     def _send_recovery_emails(
         self,
         employee_info: Dict[str, Any],
@@ -391,11 +708,8 @@ class EmployeeLifecycleAgent:
             manager_email = manager_info.get("manager_email") if manager_info and "error" not in manager_info else None
             
             # Format dates for display
-            resign_dt = datetime.fromisoformat(resignation_date)
-            due_dt = datetime.fromisoformat(return_due_date)
-            
-            resign_str = resign_dt.strftime("%B %d, %Y")
-            due_str = due_dt.strftime("%B %d, %Y")
+            resign_str = _iso_to_pretty(resignation_date)
+            due_str = _iso_to_pretty(return_due_date)
             
             # Send email
             result = EmailService.send_asset_return_notice(
@@ -416,61 +730,21 @@ class EmployeeLifecycleAgent:
                 "error": str(e)
             }
     
-    def _fallback_asset_assignment(self, employee_id: int, db: Session) -> Dict[str, Any]:
-        """
-        Fallback deterministic asset assignment when LLM is not available
+    @staticmethod
+    def _get_health_data(db: Session, age_threshold_years: int):
         """
-        logger.info("Using fallback asset assignment (LLM not available)")
-        
-        # Get requirements
-        requirements = EmployeeLifecycleTools.get_asset_requirements(employee_id, db)
-        
-        if "error" in requirements:
-            return {"success": False, "error": requirements["error"]}
-        
-        assignments = []
-        failed_assignments = []
+        Get the health summary and refresh candidates, reusing recent results
         
-        # Assign each required asset type
-        for req in requirements["assets_needed"]:
-            device_type = req["type"]
-            quantity = req["quantity"]
-            
-            # Find available assets
-            available = EmployeeLifecycleTools.find_available_assets(device_type, quantity, db)
-            
-            if available["available_count"] < quantity:
-                failed_assignments.append({
-                    "device_type": device_type,
-                    "required": quantity,
-                    "available": available["available_count"],
-                    "message": f"Insufficient {device_type}s: need {quantity}, found {available['available_count']}"
-                })
+        Args:
+            db: Database session
+            age_threshold_years: Age threshold for marking assets for refresh
             
-            # Assign available assets
-            for asset in available["assets"]:
-                result = EmployeeLifecycleTools.assign_asset_to_employee(
-                    employee_id,
-                    asset["asset_id"],
-                    db
-                )
-                
-                if result["success"]:
-                    assignments.append(result)
-                else:
-                    failed_assignments.append(result)
-        
-        # Get final summary
-        summary = EmployeeLifecycleTools.get_assignment_summary(employee_id, db)
-        
-        return {
-            "success": len(failed_assignments) == 0,
-            "assignment_summary": summary,
-            "assignments_completed": len(assignments),
-            "failed_assignments": failed_assignments,
-            "message": f"Asset assignment completed for employee {employee_id}. "
-                      f"{len(assignments)} assets assigned, {len(failed_assignments)} failed."
-        }
+        Returns:
+            Tuple of (health summary, refresh result)
+        """
+        health_summary = _cached_health_summary(db)
+        refresh_result = _cached_assets_for_refresh(db, age_threshold_years)
+        return health_summary, refresh_result
     
     def track_asset_health(
         self,
@@ -491,14 +765,7 @@ class EmployeeLifecycleAgent:
         logger.info(f"Tracking asset health with {age_threshold_years} year threshold")
         
         try:
-            # Get assets for refresh
-            refresh_result = EmployeeLifecycleTools.get_assets_for_refresh(
-                db,
-                age_threshold_years
-            )
-            
-            # Get health summary
-            health_summary = EmployeeLifecycleTools.get_asset_health_summary(db)
+            health_summary, refresh_result = self._get_health_data(db, age_threshold_years)
             
             return {
                 "success": True,
@@ -518,15 +785,17 @@ class EmployeeLifecycleAgent:
                 "error": str(e)
             }
     
-    def get_asset_health_report(
+    async def get_asset_health_report(
         self,
-        db: Session
+        db: Session,
+        include_details: bool = True
     ) -> Dict[str, Any]:
         """
         Get comprehensive asset health report
         
         Args:
             db: Database session
+            include_details: Include the per-asset urgent/recommended lists
             
         Returns:
             Dictionary with comprehensive health report
@@ -535,27 +804,53 @@ class EmployeeLifecycleAgent:
         logger.info("Generating comprehensive asset health report")
         
         try:
-            health_summary = EmployeeLifecycleTools.get_asset_health_summary(db)
-            refresh_result = EmployeeLifecycleTools.get_assets_for_refresh(db, 3)
+            # The queries are independent; run them concurrently, each on its own session
+            session_factory = _session_factory(db)
             
-            # Categorize refresh assets by urgency
-            urgent_assets = [a for a in refresh_result["assets_for_refresh"] if a["refresh_status"] == "URGENT"]
-            recommended_assets = [a for a in refresh_result["assets_for_refresh"] if a["refresh_status"] == "RECOMMENDED"]
+            # With details the counts come from the loaded assets so they always match the lists;
+            # otherwise only the SQL aggregate is needed
+            refresh_loader = _cached_assets_for_refresh if include_details else _cached_refresh_counts
+            health_summary, refresh_result = await asyncio.gather(
+                _run_in_new_session(session_factory, _cached_health_summary),
+                _run_in_new_session(session_factory, refresh_loader, 3)
+            )
             
-            return {
+            if include_details:
+                # Categorize refresh assets by urgency in a single pass
+                urgent_assets = []
+                recommended_assets = []
+                for a in refresh_result["assets_for_refresh"]:
+                    status = a["refresh_status"]
+                    if status == "URGENT":
+                        urgent_assets.append(a)
+                    elif status == "RECOMMENDED":
+                        recommended_assets.append(a)
+                
+                urgent_count = len(urgent_assets)
+                recommended_count = len(recommended_assets)
+            else:
+                by_status = refresh_result["by_status"]
+                urgent_count = by_status["URGENT"]["count"]
+                recommended_count = by_status["RECOMMENDED"]["count"]
+            
+            report = {
                 "success": True,
                 "report_date": datetime.now().isoformat(),
                 "total_assets": health_summary["total_assets"],
                 "health_metrics": health_summary.get("health_summary", {}),
                 "refresh_summary": {
                     "total_for_refresh": refresh_result["refresh_count"],
-                    "urgent_refresh": len(urgent_assets),
-                    "recommended_refresh": len(recommended_assets),
+                    "urgent_refresh": urgent_count,
+                    "recommended_refresh": recommended_count,
                     "total_refresh_value": refresh_result["total_refresh_value"]
-                },
-                "urgent_assets": urgent_assets,
-                "recommended_assets": recommended_assets
+                }
             }
+            
+            if include_details:
+                report["urgent_assets"] = urgent_assets
+                report["recommended_assets"] = recommended_assets
+            
+            return report
         
         except Exception as e:
             logger.error(f"Error generating health report: {e}")
@@ -716,15 +1011,12 @@ class EmployeeLifecycleAgent:
             }
 
 
-# Singleton instance
-_lifecycle_agent_instance = None
+# Singleton instance, built at import so the first request doesn't pay for setup
+_lifecycle_agent_instance = EmployeeLifecycleAgent()
 
 
 def get_employee_lifecycle_agent() -> EmployeeLifecycleAgent:
-    """Get or create the singleton agent instance"""
-    global _lifecycle_agent_instance
-    if _lifecycle_agent_instance is None:
-        _lifecycle_agent_instance = EmployeeLifecycleAgent()
+    """Get the singleton agent instance"""
     return _lifecycle_agent_instance
 
 
@@ -4,9 +4,9 @@ Asset Recovery Agent for handling employee resignation and asset return scheduli
 
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import date
 from src.config import settings
 from src.agent.tool.recovery_tools import AssetRecoveryTools
 from src.email_service import EmailService
@@ -42,82 +42,22 @@ class AssetRecoveryAgent:
         logger.info(f"Processing resignation for employee {employee_id}")
         
         try:
-            # Get employee assets
-            employee_info = AssetRecoveryTools.get_employee_assets(employee_id, db)
+            # Get employee, manager and assets in one round of queries
+            bundle = AssetRecoveryTools.fetch_resignation_bundle(employee_id, db)
             
-            if "error" in employee_info:
-                return {
-                    "success": False,
-                    "error": employee_info["error"]
-                }
-            
-            # If no assets, just return success
-            if employee_info["total_assets"] == 0:
-                logger.info(f"Employee {employee_id} has no assets to recover")
-                return {
-                    "success": True,
-                    "message": f"Employee {employee_info['employee_name']} has no assigned assets",
-                    "total_assets": 0,
-                    "assets_scheduled": 0,
-                    "email_sent": False
-                }
-            
-            # Calculate return due date
-            resignation_date = employee_info["resignation_date"]
-            if not resignation_date:
-                logger.error(f"Employee {employee_id} has no resignation date set")
-                return {
-                    "success": False,
-                    "error": "Employee resignation date not set"
-                }
-            
-            return_due_date = AssetRecoveryTools.calculate_return_due_date(resignation_date, return_days)
-            
-            # Schedule asset returns
-            schedule_result = AssetRecoveryTools.schedule_asset_returns(
-                employee_id,
-                return_due_date,
-                db
-            )
-            
-            if not schedule_result["success"]:
-                return {
-                    "success": False,
-                    "error": schedule_result["error"]
-                }
-            
-            # Get manager info
-            manager_info = {}
-            if employee_info["manager_id"]:
-                manager_info = AssetRecoveryTools.get_manager_info(
-                    employee_info["manager_id"],
-                    db
-                )
+            result, plan = self._schedule_recovery(employee_id, bundle, db, return_days)
+            if result:
+                return result
             
             # Send email notifications
             email_result = self._send_recovery_emails(
-                employee_info,
-                manager_info,
-                return_due_date,
+                plan["employee_info"],
+                plan["manager_info"],
+                plan["return_due_date"],
                 return_days
             )
             
-            # Get final summary
-            summary = AssetRecoveryTools.get_resignation_summary(employee_id, db)
-            
-            return {
-                "success": True,
-                "message": f"Asset recovery initiated for {employee_info['employee_name']}",
-                "employee_id": employee_id,
-                "employee_name": employee_info["employee_name"],
-                "resignation_date": resignation_date,
-                "return_due_date": return_due_date,
-                "total_assets": employee_info["total_assets"],
-                "assets_scheduled": schedule_result["assets_affected"],
-                "email_sent": email_result.get("success", False),
-                "email_message": email_result.get("message", ""),
-                "summary": summary
-            }
+            return self._build_recovery_result(plan, email_result)
         
         except Exception as e:
             logger.error(f"Error processing resignation: {e}")
@@ -126,11 +66,194 @@ class AssetRecoveryAgent:
                 "error": str(e)
             }
     
+    def process_resignations_bulk(
+        self,
+        employee_ids: List[int],
+        db: Session,
+        return_days: int = 7
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Process several resignations at once, fetching their data in one batch
+        and sending all return notices over a single email connection
+        
+        Args:
+            employee_ids: IDs of resigning employees
+            db: Database session
+            return_days: Days until return due (default 7)
+            
+        Returns:
+            Dictionary mapping each employee ID to its recovery process results
+        """
+        
+        logger.info(f"Processing {len(employee_ids)} resignations")
+        
+        try:
+            bundles = AssetRecoveryTools.fetch_resignation_bundles(employee_ids, db)
+        except Exception as e:
+            logger.error(f"Error fetching resignations: {e}")
+            return {employee_id: {"success": False, "error": str(e)} for employee_id in employee_ids}
+        
+        results = {}
+        plans = {}
+        for employee_id in employee_ids:
+            try:
+                result, plan = self._schedule_recovery(employee_id, bundles.get(employee_id), db, return_days)
+            except Exception as e:
+                logger.error(f"Error processing resignation: {e}")
+                result, plan = {"success": False, "error": str(e)}, None
+            
+            if plan:
+                plans[employee_id] = plan
+            else:
+                results[employee_id] = result
+        
+        # Send email notifications
+        email_results = EmailService.send_many([
+            self._build_recovery_notice(plan["employee_info"], plan["manager_info"], plan["return_due_date"])
+            for plan in plans.values()
+        ])
+        
+        for (employee_id, plan), email_result in zip(plans.items(), email_results):
+            results[employee_id] = self._build_recovery_result(plan, email_result)
+        
+        return {employee_id: results[employee_id] for employee_id in employee_ids}
+    
+    def _schedule_recovery(
+        self,
+        employee_id: int,
+        bundle: Optional[Dict[str, Any]],
+        db: Session,
+        return_days: int
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Schedule asset returns for a fetched resignation bundle
+        
+        Args:
+            employee_id: ID of resigning employee
+            bundle: Result of fetch_resignation_bundle (None if not found)
+            db: Database session
+            return_days: Days until return due
+            
+        Returns:
+            (result, None) when processing ends early, otherwise (None, plan)
+            with the data needed to notify the employee
+        """
+        if not bundle:
+            return {
+                "success": False,
+                "error": f"Employee {employee_id} not found"
+            }, None
+        
+        employee_info = {
+            **bundle["employee"],
+            "total_assets": len(bundle["assets"]),
+            "assets": bundle["assets"]
+        }
+        
+        # If no assets, just return success
+        if employee_info["total_assets"] == 0:
+            logger.info(f"Employee {employee_id} has no assets to recover")
+            return {
+                "success": True,
+                "message": f"Employee {employee_info['employee_name']} has no assigned assets",
+                "total_assets": 0,
+                "assets_scheduled": 0,
+                "email_sent": False
+            }, None
+        
+        # Calculate return due date
+        resignation_date = employee_info["resignation_date"]
+        if not resignation_date:
+            logger.error(f"Employee {employee_id} has no resignation date set")
+            return {
+                "success": False,
+                "error": "Employee resignation date not set"
+            }, None
+        
+        return_due_date = AssetRecoveryTools.calculate_return_due_date(resignation_date, return_days)
+        
+        # Schedule asset returns for the assets already fetched
+        schedule_result = AssetRecoveryTools.schedule_asset_returns(
+            employee_id,
+            return_due_date,
+            db,
+            asset_ids=[asset["asset_id"] for asset in bundle["assets"]]
+        )
+        
+        if not schedule_result["success"]:
+            return {
+                "success": False,
+                "error": schedule_result["error"]
+            }, None
+        
+        for asset in bundle["assets"]:
+            asset["return_due_date"] = return_due_date
+        
+        # Get manager info
+        manager_info = {}
+        if employee_info["manager_id"]:
+            manager_info = bundle["manager"] or {
+                "error": f"Manager {employee_info['manager_id']} not found",
+                "manager_id": employee_info["manager_id"]
+            }
+        
+        return None, {
+            "bundle": bundle,
+            "employee_info": employee_info,
+            "manager_info": manager_info,
+            "return_due_date": return_due_date,
+            "schedule_result": schedule_result
+        }
+    
+    def _build_recovery_result(self, plan: Dict[str, Any], email_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the recovery result for a scheduled resignation"""
+        employee_info = plan["employee_info"]
+        
+        # Get final summary
+        summary = AssetRecoveryTools.summarize_resignation(plan["bundle"])
+        
+        return {
+            "success": True,
+            "message": f"Asset recovery initiated for {employee_info['employee_name']}",
+            "employee_id": employee_info["employee_id"],
+            "employee_name": employee_info["employee_name"],
+            "resignation_date": employee_info["resignation_date"].isoformat(),
+            "return_due_date": plan["return_due_date"].isoformat(),
+            "total_assets": employee_info["total_assets"],
+            "assets_scheduled": plan["schedule_result"]["assets_affected"],
+            "email_sent": email_result.get("success", False),
+            "email_message": email_result.get("message", ""),
+            "summary": summary
+        }
+    
+    def _build_recovery_notice(
+        self,
+        employee_info: Dict[str, Any],
+        manager_info: Dict[str, Any],
+        return_due_date: date
+    ) -> Dict[str, Any]:
+        """Build the asset return notice email for an employee"""
+        resignation_date = employee_info["resignation_date"]
+        manager_email = manager_info.get("manager_email") if manager_info and "error" not in manager_info else None
+        
+        # Format dates for display
+        resign_str = resignation_date.strftime("%B %d, %Y")
+        due_str = return_due_date.strftime("%B %d, %Y")
+        
+        return EmailService.build_asset_return_notice(
+            employee_name=employee_info["employee_name"],
+            employee_email=employee_info["employee_email"],
+            manager_email=manager_email,
+            resignation_date=resign_str,
+            return_due_date=due_str,
+            assets=employee_info["assets"]
+        )
+    
     def _send_recovery_emails(
         self,
         employee_info: Dict[str, Any],
         manager_info: Dict[str, Any],
-        return_due_date: str,
+        return_due_date: date,
         return_days: int
     ) -> Dict[str, Any]:
         """
@@ -147,27 +270,10 @@ class AssetRecoveryAgent:
         """
         
         try:
-            resignation_date = employee_info["resignation_date"]
-            manager_email = manager_info.get("manager_email") if manager_info and "error" not in manager_info else None
-            
-            # Format dates for display
-            resign_dt = datetime.fromisoformat(resignation_date)
-            due_dt = datetime.fromisoformat(return_due_date)
-            
-            resign_str = resign_dt.strftime("%B %d, %Y")
-            due_str = due_dt.strftime("%B %d, %Y")
-            
             # Send email
-            result = EmailService.send_asset_return_notice(
-                employee_name=employee_info["employee_name"],
-                employee_email=employee_info["employee_email"],
-                manager_email=manager_email,
-                resignation_date=resign_str,
-                return_due_date=due_str,
-                assets=employee_info["assets"]
+            return EmailService.send_email(
+                **self._build_recovery_notice(employee_info, manager_info, return_due_date)
             )
-            
-            return result
         
         except Exception as e:
             logger.error(f"Error sending recovery emails: {e}")
@@ -177,13 +283,10 @@ class AssetRecoveryAgent:
             }
 
 
-# Singleton instance
-_recovery_agent_instance = None
+# Singleton instance, bound at import so concurrent first calls can't race
+_recovery_agent_instance = AssetRecoveryAgent()
 
 
 def get_asset_recovery_agent() -> AssetRecoveryAgent:
-    """Get or create the singleton recovery agent instance"""
-    global _recovery_agent_instance
-    if _recovery_agent_instance is None:
-        _recovery_agent_instance = AssetRecoveryAgent()
+    """Get the singleton recovery agent instance"""
     return _recovery_agent_instance
@@ -1,23 +1,249 @@
 """
 Unified chatbot tools for answering various HR and asset management questions
+
+Per-employee asset lookups rely on the ix_asset_assigned_to_assigned index
+(see Asset.__table_args__; run create_asset_indexes.py on existing databases)
 """
+from sqlalchemy import Float, String, case, cast, func, select
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Tuple, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Tuple, Optional, Union
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from cachetools import LRUCache
+from datetime import date, timedelta
 from src.database.models import Employee, Asset
 from src.agent.tool.churn_prediction_tools import ChurnPredictionTools
-from src.agent.tool.tools import EmployeeLifecycleTools
+from src.agent.tool.tools import EmployeeLifecycleTools, cached_employee_lookup
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionCtx:
+    """A chatbot question with its normalized form, computed once per request"""
+    raw: str
+    lower: str
+    
+    @classmethod
+    def from_question(cls, question: Union[str, "QuestionCtx"]) -> "QuestionCtx":
+        """Build a context for a question (an existing context is returned as is)"""
+        if isinstance(question, QuestionCtx):
+            return question
+        return cls(question, question.strip().lower())
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionAnalysis:
+    """Question type and entities extracted from a chatbot question"""
+    question_type: str
+    employee_id: Optional[int]
+    department: Optional[str]
+
+
+# Employee ID patterns ordered by specificity, compiled once at import (case-insensitive)
+_EMP_ID_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    # "employee with ID number 50", "employee with id 50"
+    r'employee\s+with\s+(?:id|ID)\s+(?:number\s+)?(\d+)',
+    
+    # "employee ID number 50", "employee id number 50"
+    r'employee\s+(?:id|ID)\s+(?:number\s+)?(\d+)',
+    
+    # "employee number 50", "employee no 50", "employee no. 50"
+    r'employee\s+(?:number|no\.?|num\.?)\s+(\d+)',
+    
+    # "employee 5", "employee #5"
+    r'employee\s+#?(\d+)',
+    
+    # "emp with ID 50", "emp ID 50"
+    r'emp(?:loyee)?\s+(?:with\s+)?(?:id|ID)\s+(?:number\s+)?(\d+)',
+    
+    # "emp 5", "emp #5"
+    r'emp\s+#?(\d+)',
+    
+    # "ID number 50", "id number 50"
+    r'(?:id|ID)\s+(?:number|num|no\.?)\s+(\d+)',
+    
+    # "ID 50", "id 50" (only if followed by space or end to avoid matching random "id")
+    r'(?:^|\s)(?:id|ID)\s+(\d+)(?:\s|$)',
+    
+    # "#50" (standalone)
+    r'#(\d+)',
+))
+
+# All employee ID patterns in one alternation: a single scan rules out questions without an ID.
+# Its leftmost match can differ from the priority order above, so it is only used as a prefilter
+_EMP_ID_ANY_PATTERN = re.compile(
+    "|".join(f"(?:{pattern.pattern})" for pattern in _EMP_ID_PATTERNS), re.IGNORECASE
+)
+
+# Any standalone number in a question
+_NUMBER_PATTERN = re.compile(r'\b(\d+)\b')
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into one alternation that matches any of them as a substring"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+# Keyword fallback for question classification, in priority order
+_CATEGORY_PATTERNS = {
+    # Email sending for asset recovery
+    "send_recovery_email": _keyword_pattern([
+        "send email", "send notification", "notify", "email notification",
+        "yes send", "send recovery email", "send asset return", "email him",
+        "email her", "send the email", "yes, send", "please send",
+        "okay send", "ok send", "sure send"
+    ]),
+    # Procurement forecasting questions
+    "procurement_forecast": _keyword_pattern([
+        "asset shortage", "buy more assets", "need to buy", "purchase asset",
+        "procurement", "should we buy", "do i need to buy", "need more assets",
+        "shortage", "need to purchase", "asset demand", "procurement forecast"
+    ]),
+    # Asset health report questions
+    "asset_health": _keyword_pattern([
+        "asset health", "health report", "asset condition", "aging assets",
+        "assets need refresh", "asset age", "asset status", "health summary",
+        "show report about assets", "asset overview"
+    ]),
+    # Asset count questions
+    "asset_count": _keyword_pattern([
+        "how many asset", "asset count", "assets using", "assets assigned",
+        "what assets does", "list assets", "assets held by"
+    ]),
+    # Asset assignment for new employees
+    "assign_asset": _keyword_pattern([
+        "assign asset", "available asset", "can be assigned", "what can i assign",
+        "which assets available", "assets for new employee", "onboard", "new hire",
+        "available for employee", "can assign to", "what equipment available",
+        "available equipment"
+    ]),
+    # Resignation/return questions
+    "resignation_assets": _keyword_pattern([
+        "resign", "return", "offboard", "leave", "quit", "asset return",
+        "must be returned", "need to return", "needs refresh", "replacement"
+    ]),
+    # Churn prediction list questions (which employees, who is likely)
+    "churn_list": _keyword_pattern([
+        "which employees", "who is likely", "who are likely", "list employees",
+        "which staff", "who might", "employees at risk"
+    ]),
+    # Single employee churn prediction questions
+    "churn_prediction": _keyword_pattern([
+        "churn", "resign risk", "risk", "leaving", "turnover", "attrition",
+        "probability", "predict", "likely to leave"
+    ])
+}
+
+# Multi-word phrases specific enough to classify a question without the ML model;
+# only trusted when the keyword fallback agrees (churn and resignation questions
+# are left to ML since their phrasing overlaps)
+_UNAMBIGUOUS_CATEGORY_PATTERNS = {
+    "send_recovery_email": _keyword_pattern([
+        "send recovery email", "send asset return", "send the email", "email notification"
+    ]),
+    "procurement_forecast": _keyword_pattern([
+        "procurement forecast", "asset shortage"
+    ]),
+    "asset_health": _keyword_pattern([
+        "asset health", "health summary", "aging assets"
+    ]),
+    "asset_count": _keyword_pattern([
+        "asset count", "what assets does"
+    ]),
+    "assign_asset": _keyword_pattern([
+        "assets for new employee", "what can i assign"
+    ])
+}
+
+# Resignation questions that ask about several employees
+_LIST_EMPLOYEES_PATTERN = _keyword_pattern(["which employees", "who is", "list employees"])
+
+# Refresh reason shared by every asset that doesn't need a refresh
+_OK_REASON = "Asset is still within acceptable age"
+
+# Department mentions as whole words ("in it" must not match "in italy"),
+# in priority order, scanned in one pass (group name = department)
+_DEPARTMENT_PATTERN = re.compile("|".join(
+    rf"(?P<{department}>\b(?:{_keyword_pattern(keywords).pattern})\b)"
+    for department, keywords in (
+        ("it", ["it department", "information technology", "in it", "it dept"]),
+        ("marketing", ["marketing department", "in marketing", "marketing dept"])
+    )
+))
+
+# Department and role mentions when onboarding a new employee, in priority order
+_ONBOARD_DEPARTMENT_PATTERNS = {
+    "it": _keyword_pattern(["it department", "in it", "it team", "it employee"]),
+    "marketing": _keyword_pattern(["marketing department", "in marketing", "marketing team", "marketing employee"])
+}
+_ONBOARD_ROLE_PATTERNS = {
+    "manager": _keyword_pattern(["manager", "team lead", "head of"]),
+    "developer": _keyword_pattern(["developer", "engineer", "programmer", "software engineer"]),
+    "specialist": _keyword_pattern(["specialist", "analyst", "coordinator", "staff"])
+}
+
+# Department-scoped churn questions
+_DEPARTMENT_SCOPE_PATTERN = _keyword_pattern(["it department", "marketing department", "in it", "in marketing"])
+
+# Follow-up answers to an assign_asset question
+_FOLLOWUP_EXPLICIT_KEYWORDS = [
+    'role is', 'department is', 'position is', 'job is',
+    'he is a', 'she is a', 'he is an', 'she is an',
+    'they are a', 'they are an'
+]
+_FOLLOWUP_DEPARTMENT_KEYWORDS = [
+    'in it', 'in marketing', 'it department', 'marketing department',
+    'it team', 'marketing team', 'from it', 'from marketing'
+]
+_FOLLOWUP_ROLE_KEYWORDS = [
+    'developer', 'manager', 'specialist', 'engineer', 'staff',
+    'analyst', 'coordinator', 'programmer', 'team lead',
+    'head of', 'software engineer'
+]
+_FOLLOWUP_EXPLICIT_PATTERN = _keyword_pattern(_FOLLOWUP_EXPLICIT_KEYWORDS)
+_FOLLOWUP_DEPARTMENT_PATTERN = _keyword_pattern(_FOLLOWUP_DEPARTMENT_KEYWORDS)
+_FOLLOWUP_ROLE_PATTERN = _keyword_pattern(_FOLLOWUP_ROLE_KEYWORDS)
+# Any of the above, so the common case is decided in a single scan
+_FOLLOWUP_INFO_PATTERN = _keyword_pattern(
+    _FOLLOWUP_EXPLICIT_KEYWORDS + _FOLLOWUP_DEPARTMENT_KEYWORDS + _FOLLOWUP_ROLE_KEYWORDS
+)
+_FOLLOWUP_OTHER_TOPIC_PATTERN = _keyword_pattern([
+    'churn', 'resign', 'quit', 'leave', 'turnover', 'attrition',
+    'how many asset', 'asset count', 'procurement', 'buy',
+    'asset health', 'send email', 'recovery', 'return',
+    'what assets does', 'list assets', 'show assets'
+])
 
 
 class UnifiedChatbotTools:
     """Tools for answering various chatbot questions"""
     
+    # Sentence embedding model; served through ONNX Runtime when it is installed
+    # (pip install "sentence-transformers[onnx]"), otherwise through PyTorch
+    MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+    ONNX_MODEL_FILE = 'onnx/model.onnx'
+    # Resolved from this file so the cache is found whatever the working directory
+    CATEGORY_EMBEDDINGS_PATH = os.path.normpath(os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ml', 'category_embeddings_{key}.npy'
+    ))
+    
     # Class-level model and embeddings (loaded once)
     _model = None
     _category_embeddings = None
     _categories = None
+    # Normalized context-phrase embeddings per candidate employee number,
+    # quantized to int8 (components scaled by EMBEDDING_INT8_SCALE)
+    EMBEDDING_INT8_SCALE = 127
+    _context_variant_cache = LRUCache(maxsize=1024)
+    _context_variant_lock = threading.Lock()
     
     # Example questions for each category
     EXAMPLE_QUESTIONS = {
@@ -102,12 +328,65 @@ class UnifiedChatbotTools:
         ]
     }
     
+    # Example phrases that indicate employee ID context
+    EMPLOYEE_CONTEXT_PHRASES = (
+        "employee {num}",
+        "employee with ID {num}",
+        "employee ID {num}",
+        "emp {num}",
+        "staff member {num}",
+        "worker {num}"
+    )
+
+    # Onboarding asset requirements keyed by (department, is_manager);
+    # (None, is_manager) covers departments without a specific kit
+    ASSET_REQUIREMENTS = {
+        # IT employees: 1 laptop + 2 monitors
+        ("it", False): (
+            {"type": "laptop", "quantity": 1, "priority": 1},
+            {"type": "monitor", "quantity": 2, "priority": 2},
+        ),
+        # Marketing employees: 1 laptop + 1 monitor
+        ("marketing", False): (
+            {"type": "laptop", "quantity": 1, "priority": 1},
+            {"type": "monitor", "quantity": 1, "priority": 2},
+        ),
+        (None, False): (),
+        # Managers get an additional phone
+        ("it", True): (
+            {"type": "laptop", "quantity": 1, "priority": 1},
+            {"type": "monitor", "quantity": 2, "priority": 2},
+            {"type": "phone", "quantity": 1, "priority": 3},
+        ),
+        ("marketing", True): (
+            {"type": "laptop", "quantity": 1, "priority": 1},
+            {"type": "monitor", "quantity": 1, "priority": 2},
+            {"type": "phone", "quantity": 1, "priority": 3},
+        ),
+        (None, True): (
+            {"type": "phone", "quantity": 1, "priority": 3},
+        ),
+    }
+    
     @classmethod
     def _load_model(cls):
         """Load the sentence transformer model and compute category embeddings"""
         if cls._model is None:
             # Use a small, fast model optimized for semantic similarity
-            cls._model = SentenceTransformer('all-MiniLM-L6-v2')
+            try:
+                cls._model = SentenceTransformer(
+                    cls.MODEL_NAME, backend='onnx', model_kwargs={'file_name': cls.ONNX_MODEL_FILE}
+                )
+                backend, precision = 'onnx', 'fp32'
+            except Exception as e:
+                print(f"[ML Model] ONNX backend unavailable ({e}), using PyTorch")
+                cls._model = SentenceTransformer(cls.MODEL_NAME)
+                backend, precision = 'torch', 'fp32'
+                
+                # Half precision halves transformer bandwidth on GPU; embeddings are cast back to float32
+                if cls._model.device.type == 'cuda':
+                    cls._model.half()
+                    precision = 'fp16'
             
             # Prepare category examples
             cls._categories = []
@@ -118,11 +397,78 @@ class UnifiedChatbotTools:
                 # Combine all examples for this category into one representative text
                 category_texts.append(" | ".join(examples))
             
-            # Compute embeddings for all categories
-            cls._category_embeddings = cls._model.encode(category_texts, convert_to_tensor=False)
+            # Reuse unit-length category embeddings saved by an earlier run, keyed by model,
+            # backend, precision and examples
+            cache_key = hashlib.sha256(
+                json.dumps([cls.MODEL_NAME, backend, precision, cls._categories, category_texts]).encode('utf-8')
+            ).hexdigest()[:16]
+            cache_path = cls.CATEGORY_EMBEDDINGS_PATH.format(key=cache_key)
+            
+            try:
+                cls._category_embeddings = np.load(cache_path, mmap_mode='r')
+            except (OSError, ValueError):
+                # Compute unit-length embeddings for all categories (cosine similarity is a dot product)
+                cls._category_embeddings = cls._model.encode(
+                    category_texts, convert_to_tensor=False, normalize_embeddings=True
+                ).astype(np.float32)
+                
+                try:
+                    np.save(cache_path, cls._category_embeddings)
+                except OSError as e:
+                    print(f"[ML Model] Could not cache category embeddings ({e})")
         
         return cls._model
     
+    @classmethod
+    @lru_cache(maxsize=2048)
+    def _encode_question_bytes(cls, question: str) -> bytes:
+        """Unit-length float32 embedding of a question as immutable bytes; memoized"""
+        embedding = cls._model.encode([question], convert_to_tensor=False, normalize_embeddings=True)[0]
+        return embedding.astype(np.float32).tobytes()
+    
+    @classmethod
+    def _encode_question(cls, question: str) -> np.ndarray:
+        """Get the (read-only) unit-length embedding of a question"""
+        return np.frombuffer(cls._encode_question_bytes(question), dtype=np.float32)
+    
+    @classmethod
+    def _context_variant_embeddings(cls, numbers: List[str]) -> np.ndarray:
+        """
+        Get int8-quantized unit-length embeddings of the employee context phrases for each number
+        Numbers not seen before are encoded together in a single batch
+        
+        Args:
+            numbers: Candidate employee numbers
+            
+        Returns:
+            int8 array of shape (len(numbers), len(EMPLOYEE_CONTEXT_PHRASES), dim),
+            scaled by EMBEDDING_INT8_SCALE
+        """
+        with cls._context_variant_lock:
+            found = {
+                number: cls._context_variant_cache[number]
+                for number in numbers if number in cls._context_variant_cache
+            }
+        missing = [number for number in dict.fromkeys(numbers) if number not in found]
+        
+        if missing:
+            context_variants = [
+                phrase.format(num=number) for number in missing for phrase in cls.EMPLOYEE_CONTEXT_PHRASES
+            ]
+            embeddings = cls._model.encode(
+                context_variants, batch_size=64, convert_to_tensor=False, normalize_embeddings=True
+            )
+            # Unit-length components lie in [-1, 1], so one fixed scale fits every vector
+            embeddings = np.clip(np.round(embeddings * cls.EMBEDDING_INT8_SCALE), -127, 127).astype(np.int8)
+            
+            found.update(zip(missing, embeddings.reshape(len(missing), len(cls.EMPLOYEE_CONTEXT_PHRASES), -1)))
+            
+            with cls._context_variant_lock:
+                for number in missing:
+                    cls._context_variant_cache[number] = found[number]
+        
+        return np.stack([found[number] for number in numbers])
+    
     @classmethod
     def classify_question_with_ml(cls, question: str, threshold: float = 0.4) -> Tuple[str, float]:
         """
@@ -138,20 +484,15 @@ class UnifiedChatbotTools:
         # Load model if not already loaded
         cls._load_model()
         
-        # Encode the question
-        question_embedding = cls._model.encode([question], convert_to_tensor=False)[0]
+        # Encode the question (repeated questions reuse their embedding)
+        question_embedding = cls._encode_question(question)
         
-        # Compute cosine similarity with all categories
-        similarities = []
-        for cat_embedding in cls._category_embeddings:
-            similarity = np.dot(question_embedding, cat_embedding) / (
-                np.linalg.norm(question_embedding) * np.linalg.norm(cat_embedding)
-            )
-            similarities.append(similarity)
+        # Compute cosine similarity with all categories in one matrix-vector product
+        similarities = cls._category_embeddings @ question_embedding
         
         # Find the best match
-        max_similarity = max(similarities)
-        best_category_idx = similarities.index(max_similarity)
+        best_category_idx = int(similarities.argmax())
+        max_similarity = float(similarities[best_category_idx])
         best_category = cls._categories[best_category_idx]
         
         # If similarity is too low, return 'general'
@@ -161,18 +502,32 @@ class UnifiedChatbotTools:
         return best_category, max_similarity
     
     @staticmethod
-    def get_employee_asset_count(employee_id: int, db: Session) -> Dict[str, Any]:
+    def get_employee_asset_count(employee_id: int, db: Session, include_details: bool = True) -> Dict[str, Any]:
         """
         Get count and details of assets currently assigned to an employee
         
         Args:
             employee_id: Employee ID
             db: Database session
+            include_details: Include per-asset details grouped by type
             
         Returns:
             Dictionary with asset count and details
         """
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+        # Follow-up questions about the same employee reuse the recent lookup
+        return cached_employee_lookup(
+            employee_id,
+            "asset_count" if include_details else "asset_count_summary",
+            lambda: UnifiedChatbotTools._load_employee_asset_count(employee_id, db, include_details)
+        )
+    
+    @staticmethod
+    def _load_employee_asset_count(employee_id: int, db: Session, include_details: bool) -> Dict[str, Any]:
+        """Query asset count and details for an employee"""
+        employee = db.execute(
+            select(Employee.full_name, Employee.email, Employee.department)
+            .where(Employee.employee_id == employee_id)
+        ).first()
         
         if not employee:
             return {
@@ -180,28 +535,38 @@ class UnifiedChatbotTools:
                 "error": f"Employee with ID {employee_id} not found"
             }
         
-        assets = db.query(Asset).filter(
-            Asset.assigned_to == employee_id,
-            Asset.status == "assigned"
+        assigned_filter = (Asset.assigned_to == employee_id, Asset.status == "assigned")
+        
+        # Count and value by type, aggregated in SQL
+        type_rows = db.execute(
+            select(Asset.device_type, func.count(), func.sum(func.round(Asset.current_value, 2)))
+            .where(*assigned_filter)
+            .group_by(Asset.device_type)
         ).all()
         
-        # Group by device type
-        assets_by_type = {}
-        for asset in assets:
-            if asset.device_type not in assets_by_type:
-                assets_by_type[asset.device_type] = []
-            
-            assets_by_type[asset.device_type].append({
-                "asset_tag": asset.asset_tag,
-                "brand": asset.brand,
-                "model": asset.model,
-                "condition": asset.condition,
-                "purchase_date": asset.purchase_date.isoformat(),
-                "current_value": float(asset.current_value)
-            })
+        count_by_type = {device_type: count for device_type, count, _ in type_rows}
+        total_value = sum(float(value or 0) for _, _, value in type_rows)
         
-        # Count by type
-        count_by_type = {device_type: len(items) for device_type, items in assets_by_type.items()}
+        # Group details by device type
+        assets_by_type = defaultdict(list)
+        if include_details:
+            detail_rows = db.execute(
+                select(
+                    Asset.device_type, Asset.asset_tag, Asset.brand, Asset.model, Asset.condition,
+                    cast(Asset.purchase_date, String).label("purchase_date"),
+                    cast(func.round(Asset.current_value, 2), Float).label("current_value")
+                ).where(*assigned_filter)
+            ).all()
+            
+            for row in detail_rows:
+                assets_by_type[row.device_type].append({
+                    "asset_tag": row.asset_tag,
+                    "brand": row.brand,
+                    "model": row.model,
+                    "condition": row.condition,
+                    "purchase_date": row.purchase_date,
+                    "current_value": row.current_value
+                })
         
         return {
             "success": True,
@@ -209,10 +574,10 @@ class UnifiedChatbotTools:
             "employee_name": employee.full_name,
             "employee_email": employee.email,
             "department": employee.department,
-            "total_assets": len(assets),
+            "total_assets": sum(count_by_type.values()),
             "count_by_type": count_by_type,
-            "assets_by_type": assets_by_type,
-            "total_asset_value": round(sum(float(a.current_value) for a in assets), 2)
+            "assets_by_type": dict(assets_by_type),
+            "total_asset_value": round(total_value, 2)
         }
     
     @staticmethod
@@ -235,8 +600,6 @@ class UnifiedChatbotTools:
             Dictionary with available assets organized by requirements
         """
         try:
-            from src.agent.tool.tools import EmployeeLifecycleTools
-            
             employee_name = "New Employee"
             employee_dept = department
             employee_role = role
@@ -264,46 +627,34 @@ class UnifiedChatbotTools:
                     "message": "To determine asset requirements, please provide the employee's role and department."
                 }
             
-            # Build a temporary employee-like structure for requirements
-            # We'll directly calculate requirements instead of using get_asset_requirements
+            # Look up requirements directly instead of using get_asset_requirements
             # to avoid needing an actual employee record
-            
-            assets_needed = []
-            
-            # IT employees: 1 laptop + 2 monitors
-            if employee_dept.lower() == "it":
-                assets_needed = [
-                    {"type": "laptop", "quantity": 1, "priority": 1},
-                    {"type": "monitor", "quantity": 2, "priority": 2}
-                ]
-            # Marketing employees: 1 laptop + 1 monitor
-            elif employee_dept.lower() == "marketing":
-                assets_needed = [
-                    {"type": "laptop", "quantity": 1, "priority": 1},
-                    {"type": "monitor", "quantity": 1, "priority": 2}
-                ]
-            
-            # Managers get an additional phone
-            if employee_role.lower() == "manager":
-                assets_needed.append(
-                    {"type": "phone", "quantity": 1, "priority": 3}
+            is_manager = employee_role.lower() == "manager"
+            requirements = UnifiedChatbotTools.ASSET_REQUIREMENTS
+            assets_needed = [
+                dict(req) for req in requirements.get(
+                    (employee_dept.lower(), is_manager),
+                    requirements[(None, is_manager)]
                 )
+            ]
             
             # Find available assets for each requirement
             available_assets = []
             total_available = 0
             total_needed = 0
             
+            # Fetch candidates for every required type in one query
+            results_by_type = EmployeeLifecycleTools.find_available_assets_bulk(
+                {req["type"]: req["quantity"] for req in assets_needed}, db
+            ) if assets_needed else {}
+            
             for req in assets_needed:
                 device_type = req["type"]
                 quantity = req["quantity"]
                 priority = req["priority"]
                 total_needed += quantity
                 
-                # Find available assets of this type
-                assets_result = EmployeeLifecycleTools.find_available_assets(
-                    device_type, quantity, db
-                )
+                assets_result = results_by_type[device_type]
                 
                 available_count = assets_result["available_count"]
                 total_available += available_count
@@ -349,20 +700,113 @@ class UnifiedChatbotTools:
         Returns:
             Dictionary with resignation asset info including refresh needs
         """
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+        return cached_employee_lookup(
+            employee_id,
+            "resignation_assets",
+            lambda: UnifiedChatbotTools.get_resignation_assets_info_bulk([employee_id], db)[employee_id]
+        )
+    
+    @staticmethod
+    def get_resignation_assets_info_bulk(
+        employee_ids: List[int],
+        db: Session,
+        today: Optional[date] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Get resignation asset info for several employees in two queries
+        Refresh status is computed in SQL; per-type totals in the same pass over the rows
         
-        if not employee:
-            return {
-                "success": False,
-                "error": f"Employee with ID {employee_id} not found"
-            }
+        Args:
+            employee_ids: Employee IDs
+            db: Database session
+            today: Reference date for asset ages (default today)
+            
+        Returns:
+            Dictionary mapping each employee ID to its resignation asset info
+        """
+        employees = {
+            e.employee_id: e
+            for e in db.execute(
+                select(
+                    Employee.employee_id, Employee.full_name, Employee.email, Employee.department,
+                    Employee.employment_status, Employee.resignation_date
+                ).where(Employee.employee_id.in_(employee_ids))
+            )
+        }
+        
+        today = today or date.today()
+        three_yrs = today - timedelta(days=3 * 365)
+        five_yrs = today - timedelta(days=5 * 365)
+        
+        # Assets need refresh after 3 years; after 5 years it's urgent
+        refresh_status = case(
+            (Asset.purchase_date < five_yrs, "URGENT"),
+            (Asset.purchase_date < three_yrs, "RECOMMENDED"),
+            else_="OK"
+        ).label("refresh_status")
+        assigned_filter = (Asset.assigned_to.in_(employees.keys()), Asset.status == "assigned")
         
-        # Get all assets assigned to employee
-        assets = db.query(Asset).filter(
-            Asset.assigned_to == employee_id,
-            Asset.status == "assigned"
+        # Get all assets assigned to these employees, grouped by owner;
+        # only the needed columns are loaded, already converted for the response
+        assets_by_emp = defaultdict(list)
+        summary_by_emp = defaultdict(dict)
+        total_value_by_emp = defaultdict(float)
+        asset_rows = db.execute(
+            select(
+                Asset.assigned_to, Asset.asset_tag, Asset.serial_number, Asset.device_type,
+                Asset.brand, Asset.model, Asset.condition, Asset.purchase_date,
+                cast(Asset.purchase_date, String).label("purchase_date_iso"),
+                cast(func.round(Asset.current_value, 2), Float).label("current_value"),
+                refresh_status
+            ).where(*assigned_filter)
         ).all()
         
+        # Asset ages for all rows in one vectorized subtraction
+        purchase_dates = np.array([row.purchase_date for row in asset_rows], dtype='datetime64[D]')
+        ages_years = ((np.datetime64(today, 'D') - purchase_dates).astype(np.int64) / 365).tolist()
+        
+        for row, age_years in zip(asset_rows, ages_years):
+            assets_by_emp[row.assigned_to].append((row, age_years))
+            
+            # Per-type totals for each owner, in the same pass
+            summary = summary_by_emp[row.assigned_to].setdefault(
+                row.device_type, {"total": 0, "needs_refresh": 0, "ok_to_reassign": 0}
+            )
+            summary["total"] += 1
+            if row.refresh_status == "OK":
+                summary["ok_to_reassign"] += 1
+            else:
+                summary["needs_refresh"] += 1
+            total_value_by_emp[row.assigned_to] += row.current_value
+        
+        results = {}
+        for employee_id in employee_ids:
+            employee = employees.get(employee_id)
+            if not employee:
+                results[employee_id] = {
+                    "success": False,
+                    "error": f"Employee with ID {employee_id} not found"
+                }
+            else:
+                results[employee_id] = UnifiedChatbotTools._build_resignation_info(
+                    employee,
+                    assets_by_emp[employee_id],
+                    summary_by_emp[employee_id],
+                    total_value_by_emp[employee_id]
+                )
+        
+        return results
+    
+    @staticmethod
+    def _build_resignation_info(
+        employee: Row,
+        assets: List[Tuple[Row, float]],
+        summary_by_type: Dict[str, Dict[str, int]],
+        total_value: float
+    ) -> Dict[str, Any]:
+        """Summarize one employee's row and (asset row, age in years) pairs for return and refresh"""
+        employee_id = employee.employee_id
+        
         if not assets:
             return {
                 "success": True,
@@ -372,25 +816,10 @@ class UnifiedChatbotTools:
                 "message": "This employee has no assets to return"
             }
         
-        # Analyze each asset for refresh needs (3+ years old)
-        today = datetime.now().date()
-        refresh_threshold_days = 3 * 365  # 3 years
-        
         assets_to_return = []
-        needs_refresh_count = 0
-        total_value = 0
-        
-        for asset in assets:
-            asset_age_days = (today - asset.purchase_date).days
-            asset_age_years = asset_age_days / 365
-            needs_refresh = asset_age_days > refresh_threshold_days
-            
-            if needs_refresh:
-                needs_refresh_count += 1
-            
-            total_value += float(asset.current_value)
-            
-            refresh_status = "URGENT" if asset_age_years > 5 else ("RECOMMENDED" if needs_refresh else "OK")
+        for asset, asset_age_years in assets:
+            refresh_status = asset.refresh_status
+            needs_refresh = refresh_status != "OK"
             
             assets_to_return.append({
                 "asset_tag": asset.asset_tag,
@@ -399,30 +828,15 @@ class UnifiedChatbotTools:
                 "brand": asset.brand,
                 "model": asset.model,
                 "condition": asset.condition,
-                "purchase_date": asset.purchase_date.isoformat(),
+                "purchase_date": asset.purchase_date_iso,
                 "age_years": round(asset_age_years, 1),
-                "current_value": float(asset.current_value),
+                "current_value": asset.current_value,
                 "needs_refresh": needs_refresh,
                 "refresh_status": refresh_status,
-                "refresh_reason": f"Asset is {asset_age_years:.1f} years old" if needs_refresh else "Asset is still within acceptable age"
+                "refresh_reason": f"Asset is {asset_age_years:.1f} years old" if needs_refresh else _OK_REASON
             })
         
-        # Group by device type with refresh status
-        by_type_with_refresh = {}
-        for asset in assets_to_return:
-            device_type = asset["device_type"]
-            if device_type not in by_type_with_refresh:
-                by_type_with_refresh[device_type] = {
-                    "total": 0,
-                    "needs_refresh": 0,
-                    "ok_to_reassign": 0
-                }
-            
-            by_type_with_refresh[device_type]["total"] += 1
-            if asset["needs_refresh"]:
-                by_type_with_refresh[device_type]["needs_refresh"] += 1
-            else:
-                by_type_with_refresh[device_type]["ok_to_reassign"] += 1
+        needs_refresh_count = sum(summary["needs_refresh"] for summary in summary_by_type.values())
         
         return {
             "success": True,
@@ -436,7 +850,7 @@ class UnifiedChatbotTools:
             "assets_need_refresh": needs_refresh_count,
             "assets_ok_to_reassign": len(assets_to_return) - needs_refresh_count,
             "total_asset_value": round(total_value, 2),
-            "summary_by_type": by_type_with_refresh,
+            "summary_by_type": summary_by_type,
             "assets": assets_to_return,
             "recommendation": (
                 f"When this employee resigns, {len(assets_to_return)} asset(s) must be returned. "
@@ -446,35 +860,29 @@ class UnifiedChatbotTools:
         }
     
     @staticmethod
-    def extract_role_and_department(question: str) -> Dict[str, Optional[str]]:
+    def extract_role_and_department(question: Union[str, QuestionCtx]) -> Dict[str, Optional[str]]:
         """
         Extract role and department from question text
         
         Args:
-            question: User's question
+            question: User's question or its QuestionCtx
             
         Returns:
             Dictionary with role and department (None if not found)
         """
-        import re
-        
-        question_lower = question.lower()
+        question_lower = QuestionCtx.from_question(question).lower
         
         # Extract department
-        department = None
-        if any(word in question_lower for word in ["it department", "in it", "it team", "it employee"]):
-            department = "it"
-        elif any(word in question_lower for word in ["marketing department", "in marketing", "marketing team", "marketing employee"]):
-            department = "marketing"
+        department = next(
+            (name for name, pattern in _ONBOARD_DEPARTMENT_PATTERNS.items() if pattern.search(question_lower)),
+            None
+        )
         
         # Extract role
-        role = None
-        if any(word in question_lower for word in ["manager", "team lead", "head of"]):
-            role = "manager"
-        elif any(word in question_lower for word in ["developer", "engineer", "programmer", "software engineer"]):
-            role = "developer"
-        elif any(word in question_lower for word in ["specialist", "analyst", "coordinator", "staff"]):
-            role = "specialist"
+        role = next(
+            (name for name, pattern in _ONBOARD_ROLE_PATTERNS.items() if pattern.search(question_lower)),
+            None
+        )
         
         return {
             "role": role,
@@ -484,7 +892,7 @@ class UnifiedChatbotTools:
     @classmethod
     def classify_question_type(
         cls, 
-        question: str, 
+        question: Union[str, QuestionCtx], 
         use_ml: bool = True, 
         ml_threshold: float = 0.4,
         previous_question_type: Optional[str] = None
@@ -493,7 +901,7 @@ class UnifiedChatbotTools:
         Classify the type of question being asked using ML or keyword fallback
         
         Args:
-            question: User's question
+            question: User's question or its QuestionCtx
             use_ml: Whether to use ML-based classification (default True)
             ml_threshold: Minimum confidence threshold for ML classification (default 0.4)
             previous_question_type: The question type from previous conversation turn (for context)
@@ -503,56 +911,55 @@ class UnifiedChatbotTools:
                           'churn_list', 'churn_department', 'asset_health', 
                           'procurement_forecast', 'send_recovery_email', 'assign_asset', or 'general'
         """
+        # Normalize before the cache lookup so trivially different inputs share an entry
+        return cls._classify_question_type_cached(
+            QuestionCtx.from_question(question).lower, use_ml, ml_threshold, previous_question_type
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _classify_question_type_cached(
+        cls, 
+        question_lower: str, 
+        use_ml: bool, 
+        ml_threshold: float,
+        previous_question_type: Optional[str]
+    ) -> str:
+        """Classify a normalized question; memoized since the result depends only on the inputs"""
         # Debug logging
-        print(f"[Classification] Question: '{question}'")
+        print(f"[Classification] Question: '{question_lower}'")
         print(f"[Classification] Previous question type: {previous_question_type}")
         
         # Check if this is a follow-up providing missing information
         # If previous question was assign_asset and current question provides role/dept info,
         # and doesn't clearly indicate a different topic, maintain assign_asset context
         if previous_question_type == 'assign_asset':
-            question_lower = question.lower()
-            
             # Check if this looks like a response providing role/department info
-            # Check for explicit role/dept statements
-            has_explicit_info = any(phrase in question_lower for phrase in [
-                'role is', 'department is', 'position is', 'job is',
-                'he is a', 'she is a', 'he is an', 'she is an',
-                'they are a', 'they are an'
-            ])
-            
-            # Check for department indicators
-            has_department = any(dept in question_lower for dept in [
-                'in it', 'in marketing', 'it department', 'marketing department',
-                'it team', 'marketing team', 'from it', 'from marketing'
-            ])
-            
-            # Check for role indicators
-            has_role = any(role in question_lower for role in [
-                'developer', 'manager', 'specialist', 'engineer', 'staff',
-                'analyst', 'coordinator', 'programmer', 'team lead',
-                'head of', 'software engineer'
-            ])
-            
-            # Check if it's clearly NOT about a different topic
-            is_clearly_different_topic = any(keyword in question_lower for keyword in [
-                'churn', 'resign', 'quit', 'leave', 'turnover', 'attrition',
-                'how many asset', 'asset count', 'procurement', 'buy',
-                'asset health', 'send email', 'recovery', 'return',
-                'what assets does', 'list assets', 'show assets'
-            ])
+            has_role_dept_info = bool(_FOLLOWUP_INFO_PATTERN.search(question_lower))
             
             # If providing role/dept info and not clearly a different topic, stay with assign_asset
-            has_role_dept_info = has_explicit_info or (has_department and has_role) or (has_department or has_role)
-            
-            if has_role_dept_info and not is_clearly_different_topic:
+            if has_role_dept_info and not _FOLLOWUP_OTHER_TOPIC_PATTERN.search(question_lower):
+                has_explicit_info = bool(_FOLLOWUP_EXPLICIT_PATTERN.search(question_lower))
+                has_department = bool(_FOLLOWUP_DEPARTMENT_PATTERN.search(question_lower))
+                has_role = bool(_FOLLOWUP_ROLE_PATTERN.search(question_lower))
                 print(f"[Context-Aware Classification] Maintaining assign_asset context from previous turn")
                 print(f"[Context-Aware Classification] Detected - Explicit: {has_explicit_info}, Dept: {has_department}, Role: {has_role}")
                 return 'assign_asset'
+        
         # Try ML-based classification first
         if use_ml:
+            # Skip the model when exactly one category's specific phrases match
+            # and the keyword priority order picks the same category
+            prefilter_matches = [
+                category for category, pattern in _UNAMBIGUOUS_CATEGORY_PATTERNS.items()
+                if pattern.search(question_lower)
+            ]
+            if len(prefilter_matches) == 1 and prefilter_matches[0] == cls._classify_by_keywords(question_lower):
+                print(f"[Keyword Prefilter] Type: {prefilter_matches[0]}")
+                return prefilter_matches[0]
+            
             try:
-                question_type, confidence = cls.classify_question_with_ml(question, threshold=ml_threshold)
+                question_type, confidence = cls.classify_question_with_ml(question_lower, threshold=ml_threshold)
                 
                 # If confidence is good, return the result
                 if confidence >= ml_threshold:
@@ -564,81 +971,69 @@ class UnifiedChatbotTools:
                 print(f"[ML Classification] Error: {e}, falling back to keyword matching")
         
         # Fallback to keyword-based classification
-        question_lower = question.lower()
-        
-        # Email sending for asset recovery
-        if any(keyword in question_lower for keyword in [
-            "send email", "send notification", "notify", "email notification",
-            "yes send", "send recovery email", "send asset return", "email him",
-            "email her", "send the email", "yes, send", "please send", 
-            "okay send", "ok send", "sure send"
-        ]):
-            return "send_recovery_email"
-        
-        # Procurement forecasting questions
-        if any(keyword in question_lower for keyword in [
-            "asset shortage", "buy more assets", "need to buy", "purchase asset",
-            "procurement", "should we buy", "do i need to buy", "need more assets",
-            "shortage", "need to purchase", "asset demand", "procurement forecast"
-        ]):
-            return "procurement_forecast"
-        
-        # Asset health report questions
-        if any(keyword in question_lower for keyword in [
-            "asset health", "health report", "asset condition", "aging assets",
-            "assets need refresh", "asset age", "asset status", "health summary",
-            "show report about assets", "asset overview"
-        ]):
-            return "asset_health"
-        
-        # Asset count questions
-        if any(keyword in question_lower for keyword in [
-            "how many asset", "asset count", "assets using", "assets assigned",
-            "what assets does", "list assets", "assets held by"
-        ]):
-            return "asset_count"
-        
-        # Asset assignment for new employees
-        if any(keyword in question_lower for keyword in [
-            "assign asset", "available asset", "can be assigned", "what can i assign",
-            "which assets available", "assets for new employee", "onboard", "new hire",
-            "available for employee", "can assign to", "what equipment available",
-            "available equipment"
-        ]):
-            return "assign_asset"
-        
-        # Resignation/return questions
-        if any(keyword in question_lower for keyword in [
-            "resign", "return", "offboard", "leave", "quit", "asset return",
-            "must be returned", "need to return", "needs refresh", "replacement"
-        ]):
-            # Check if it's about listing multiple employees
-            if any(keyword in question_lower for keyword in ["which employees", "who is", "list employees"]):
+        return cls._classify_by_keywords(question_lower)
+    
+    @staticmethod
+    def _classify_by_keywords(question_lower: str) -> str:
+        """Classify a normalized question by keywords, categories checked in priority order"""
+        for category, pattern in _CATEGORY_PATTERNS.items():
+            if not pattern.search(question_lower):
+                continue
+            
+            # Resignation questions about several employees are churn lists
+            if category == "resignation_assets" and not _LIST_EMPLOYEES_PATTERN.search(question_lower):
+                return category
+            
+            if category in ("resignation_assets", "churn_list"):
                 # Check if department-specific
-                if any(dept in question_lower for dept in ["it department", "marketing department", "in it", "in marketing"]):
+                if _DEPARTMENT_SCOPE_PATTERN.search(question_lower):
                     return "churn_department"
                 return "churn_list"
-            return "resignation_assets"
-        
-        # Churn prediction list questions (which employees, who is likely)
-        if any(keyword in question_lower for keyword in [
-            "which employees", "who is likely", "who are likely", "list employees",
-            "which staff", "who might", "employees at risk"
-        ]):
-            # Check if department-specific
-            if any(dept in question_lower for dept in ["it department", "marketing department", "in it", "in marketing"]):
-                return "churn_department"
-            return "churn_list"
-        
-        # Single employee churn prediction questions
-        if any(keyword in question_lower for keyword in [
-            "churn", "resign risk", "risk", "leaving", "turnover", "attrition",
-            "probability", "predict", "likely to leave"
-        ]):
-            return "churn_prediction"
+            
+            return category
         
         return "general"
     
+    @classmethod
+    def analyze_question(
+        cls,
+        question: Union[str, QuestionCtx],
+        previous_question_type: Optional[str] = None,
+        use_ml: bool = True,
+        extract_employee_id: bool = True
+    ) -> QuestionAnalysis:
+        """
+        Classify a question and extract its employee ID and department in one call
+        
+        Args:
+            question: User's question or its QuestionCtx
+            previous_question_type: The question type from previous conversation turn (for context)
+            use_ml: Whether to use ML-based classification and extraction (default True)
+            extract_employee_id: Whether to look for an employee ID (default True)
+            
+        Returns:
+            QuestionAnalysis with question type, employee ID and department
+        """
+        return cls._analyze_question_cached(
+            QuestionCtx.from_question(question).lower, previous_question_type, use_ml, extract_employee_id
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _analyze_question_cached(
+        cls,
+        question_lower: str,
+        previous_question_type: Optional[str],
+        use_ml: bool,
+        extract_employee_id: bool
+    ) -> QuestionAnalysis:
+        """Analyze a normalized question; memoized so a repeated question is one cache probe"""
+        return QuestionAnalysis(
+            question_type=cls._classify_question_type_cached(question_lower, use_ml, 0.4, previous_question_type),
+            employee_id=cls._extract_employee_id_cached(question_lower, use_ml) if extract_employee_id else None,
+            department=cls._extract_department_cached(question_lower)
+        )
+    
     @classmethod
     def extract_employee_id_with_ml(cls, question: str, use_ml: bool = True, confidence_threshold: float = 0.6) -> int:
         """
@@ -652,10 +1047,8 @@ class UnifiedChatbotTools:
         Returns:
             Employee ID if found, None otherwise
         """
-        import re
-        
         # Step 1: Find all numbers in the question
-        all_numbers = re.findall(r'\b(\d+)\b', question)
+        all_numbers = _NUMBER_PATTERN.findall(question)
         
         if not all_numbers:
             return None
@@ -670,42 +1063,19 @@ class UnifiedChatbotTools:
             try:
                 cls._load_model()
                 
-                # Example phrases that indicate employee ID context
-                employee_context_phrases = [
-                    "employee {num}",
-                    "employee with ID {num}",
-                    "employee ID {num}",
-                    "emp {num}",
-                    "staff member {num}",
-                    "worker {num}"
-                ]
-                
-                # Compute embedding for the original question
-                question_embedding = cls._model.encode([question], convert_to_tensor=False)[0]
+                # Get unit-length embedding for the original question
+                question_embedding = cls._encode_question(question)
                 
-                best_number = None
-                best_score = 0
+                # Score every number in context at once: max similarity across its variants
+                similarities = (
+                    cls._context_variant_embeddings(all_numbers) @ question_embedding
+                ) / cls.EMBEDDING_INT8_SCALE
+                number_scores = similarities.max(axis=1)
                 
-                # Check each number in context
-                for number in all_numbers:
-                    # Create context variants with this number
-                    context_variants = [phrase.format(num=number) for phrase in employee_context_phrases]
-                    
-                    # Compute embeddings for all variants
-                    variant_embeddings = cls._model.encode(context_variants, convert_to_tensor=False)
-                    
-                    # Find max similarity across all variants
-                    max_similarity = 0
-                    for variant_emb in variant_embeddings:
-                        similarity = np.dot(question_embedding, variant_emb) / (
-                            np.linalg.norm(question_embedding) * np.linalg.norm(variant_emb)
-                        )
-                        max_similarity = max(max_similarity, similarity)
-                    
-                    # Track the best matching number
-                    if max_similarity > best_score:
-                        best_score = max_similarity
-                        best_number = number
+                # Track the best matching number (first one wins ties)
+                best_idx = int(number_scores.argmax())
+                best_score = max(0, float(number_scores[best_idx]))
+                best_number = all_numbers[best_idx] if best_score > 0 else None
                 
                 # If confidence is high enough, return the number
                 if best_score >= confidence_threshold and best_number:
@@ -730,82 +1100,59 @@ class UnifiedChatbotTools:
         Returns:
             Employee ID if found, None otherwise
         """
-        import re
-        
-        # Comprehensive regex patterns ordered by specificity
-        patterns = [
-            # "employee with ID number 50", "employee with id 50"
-            r'employee\s+with\s+(?:id|ID)\s+(?:number\s+)?(\d+)',
-            
-            # "employee ID number 50", "employee id number 50"
-            r'employee\s+(?:id|ID)\s+(?:number\s+)?(\d+)',
-            
-            # "employee number 50", "employee no 50", "employee no. 50"
-            r'employee\s+(?:number|no\.?|num\.?)\s+(\d+)',
-            
-            # "employee 5", "employee #5"
-            r'employee\s+#?(\d+)',
-            
-            # "emp with ID 50", "emp ID 50"
-            r'emp(?:loyee)?\s+(?:with\s+)?(?:id|ID)\s+(?:number\s+)?(\d+)',
-            
-            # "emp 5", "emp #5"
-            r'emp\s+#?(\d+)',
-            
-            # "ID number 50", "id number 50"
-            r'(?:id|ID)\s+(?:number|num|no\.?)\s+(\d+)',
-            
-            # "ID 50", "id 50" (only if followed by space or end to avoid matching random "id")
-            r'(?:^|\s)(?:id|ID)\s+(\d+)(?:\s|$)',
-            
-            # "#50" (standalone)
-            r'#(\d+)',
-        ]
+        # Most questions carry no ID; rule them out in one scan
+        if not _EMP_ID_ANY_PATTERN.search(question):
+            return None
         
-        for pattern in patterns:
-            match = re.search(pattern, question.lower())
+        for pattern in _EMP_ID_PATTERNS:
+            match = pattern.search(question)
             if match:
                 return int(match.group(1))
         
         return None
     
     @classmethod
-    def extract_employee_id(cls, question: str, use_ml: bool = True) -> int:
+    def extract_employee_id(cls, question: Union[str, QuestionCtx], use_ml: bool = True) -> int:
         """
         Extract employee ID from question text (wrapper method for backward compatibility)
         
         Args:
-            question: User's question
+            question: User's question or its QuestionCtx
             use_ml: Whether to use ML-based extraction (default True)
             
         Returns:
             Employee ID if found, None otherwise
         """
+        return cls._extract_employee_id_cached(QuestionCtx.from_question(question).lower, use_ml)
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _extract_employee_id_cached(cls, question: str, use_ml: bool) -> int:
+        """Extract employee ID from a normalized question; memoized"""
         return cls.extract_employee_id_with_ml(question, use_ml=use_ml)
     
     @staticmethod
-    def extract_department(question: str) -> str:
+    def extract_department(question: Union[str, QuestionCtx]) -> str:
         """
         Extract department from question text
         
         Args:
-            question: User's question
+            question: User's question or its QuestionCtx
             
         Returns:
             Department name ('it' or 'marketing') if found, None otherwise
         """
-        question_lower = question.lower()
-        
-        # Check for IT department
-        if any(keyword in question_lower for keyword in [
-            "it department", "information technology", "in it", "it dept"
-        ]):
-            return "it"
-        
-        # Check for Marketing department
-        if any(keyword in question_lower for keyword in [
-            "marketing department", "in marketing", "marketing dept"
-        ]):
-            return "marketing"
+        return UnifiedChatbotTools._extract_department_cached(QuestionCtx.from_question(question).lower)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _extract_department_cached(question_lower: str) -> str:
+        """Extract department from a normalized question; memoized"""
+        found = None
+        for match in _DEPARTMENT_PATTERN.finditer(question_lower):
+            # IT takes priority over marketing wherever it appears
+            if match.lastgroup == "it":
+                return "it"
+            found = match.lastgroup
         
-        return None
+        return found
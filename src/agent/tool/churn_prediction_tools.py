@@ -5,10 +5,20 @@ Provides ML-based predictions for employee resignation risk
 
 import pickle
 import json
+import hashlib
+import operator
+import sys
 import numpy as np
-from typing import Dict, Any, List
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import groupby, islice
+from statistics import fmean
+from typing import Dict, Any, List, Tuple, Optional
+from sqlalchemy import func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from src.database.models import Employee, HRAnalytic
+from src.database.models import Employee, HRAnalytic, ChurnPrediction
 from datetime import datetime, timedelta
 
 
@@ -17,9 +27,31 @@ class ChurnPredictionTools:
     
     MODEL_PATH = 'src/ml/churn_model.pkl'
     METADATA_PATH = 'src/ml/churn_model_metadata.json'
+    TOP_RISK_FACTORS = 5  # Risk factors reported per prediction
+    PREDICTION_CACHE_TTL = timedelta(days=7)  # How long a stored prediction is reused
+    HR_HISTORY_MONTHS = 24  # Monthly HR records used for features (last 2 years)
+    # Feature values that indicate churn risk: feature -> (comparison, threshold)
+    RISK_INDICATORS = {
+        'months_since_last_promotion': (operator.gt, 24),
+        'salary_change_percent_1y': (operator.lt, 5),
+        'performance_rating_trend': (operator.lt, 0),
+        'engagement_score_latest': (operator.lt, 3.5),
+        'engagement_score_trend': (operator.lt, 0),
+        'manager_changes': (operator.gt, 1),
+        'sick_days_ytd': (operator.gt, 10),
+        'training_hours_ytd': (operator.lt, 30)
+    }
+    # HR analytics columns read by _features_from_records
+    HR_FEATURE_COLUMNS = (
+        'performance_rating', 'engagement_score', 'salary_change_percent', 'overtime_hours',
+        'manager_changes', 'department_changes', 'months_since_last_promotion', 'sick_days_ytd',
+        'unplanned_leaves', 'training_hours', 'remote_work_percent', 'project_count'
+    )
     
     _model = None
     _metadata = None
+    _feature_names = ()
+    _top_risk_features = ()
     
     @classmethod
     def load_model(cls):
@@ -32,6 +64,17 @@ class ChurnPredictionTools:
                 with open(cls.METADATA_PATH, 'r') as f:
                     cls._metadata = json.load(f)
                 
+                # Column order the model expects, fixed for the life of the model
+                cls._feature_names = tuple(sys.intern(name) for name in cls._metadata['feature_names'])
+                
+                # Most important features reported as risk factors, with their rounded importance and risk rule
+                cls._top_risk_features = tuple(
+                    (sys.intern(name), round(importance, 3), cls.RISK_INDICATORS.get(name))
+                    for name, importance in islice(
+                        cls._metadata.get('feature_importance', {}).items(), cls.TOP_RISK_FACTORS
+                    )
+                )
+                
                 print(f"✓ Churn model loaded: {cls._metadata.get('model_type')}")
             except FileNotFoundError:
                 print("⚠ Churn model not found. Run training script first.")
@@ -56,10 +99,61 @@ class ChurnPredictionTools:
         if not employee:
             return {"error": f"Employee {employee_id} not found"}
         
-        # Get HR analytics data for this employee
-        hr_records = db.query(HRAnalytic).filter(
-            HRAnalytic.employee_id == employee_id
-        ).order_by(HRAnalytic.record_date.desc()).limit(24).all()  # Last 2 years
+        # Get HR analytics data for this employee (feature columns only, as plain rows)
+        hr_records = db.execute(
+            select(*(getattr(HRAnalytic, column) for column in cls.HR_FEATURE_COLUMNS)).where(
+                HRAnalytic.employee_id == employee_id
+            ).order_by(HRAnalytic.record_date.desc()).limit(cls.HR_HISTORY_MONTHS)  # Last 2 years
+        ).all()
+        
+        return cls._features_from_records(employee, hr_records)
+    
+    @classmethod
+    def _hr_records_by_employee(cls, employee_ids: List[int], db: Session) -> Dict[int, List[Row]]:
+        """
+        Get the latest HR analytics records for several employees with a single query
+        
+        Args:
+            employee_ids: Employee IDs
+            db: Database session
+            
+        Returns:
+            Dictionary mapping employee ID to its records (plain rows of the feature columns), newest first
+        """
+        # Rank each employee's records newest first so only the latest ones are loaded
+        ranked = select(
+            HRAnalytic.employee_id,
+            *(getattr(HRAnalytic, column) for column in cls.HR_FEATURE_COLUMNS),
+            func.row_number().over(
+                partition_by=HRAnalytic.employee_id,
+                order_by=HRAnalytic.record_date.desc()
+            ).label('recency')
+        ).where(HRAnalytic.employee_id.in_(employee_ids)).subquery()
+        
+        hr_records = db.execute(
+            select(ranked).where(
+                ranked.c.recency <= cls.HR_HISTORY_MONTHS
+            ).order_by(ranked.c.employee_id, ranked.c.recency)
+        ).all()
+        
+        return {
+            employee_id: list(records)
+            for employee_id, records in groupby(hr_records, key=lambda r: r.employee_id)
+        }
+    
+    @classmethod
+    def _features_from_records(cls, employee: Employee, hr_records: List[Row]) -> Dict[str, Any]:
+        """
+        Calculate churn features from an employee and their HR records
+        
+        Args:
+            employee: Employee
+            hr_records: Latest HR analytics records, newest first
+            
+        Returns:
+            Dictionary with features and metadata
+        """
+        employee_id = employee.employee_id
         
         if not hr_records:
             return {"error": f"No HR analytics data found for employee {employee_id}"}
@@ -67,9 +161,17 @@ class ChurnPredictionTools:
         # Calculate features from HR data
         latest_record = hr_records[0]
         
+        # Transpose the records once: performance, engagement, salary change, overtime,
+        # manager changes, department changes
+        perf_col, eng_col, salary_col, overtime_col, manager_col, department_col = zip(*(
+            (r.performance_rating, r.engagement_score, r.salary_change_percent,
+             r.overtime_hours, r.manager_changes, r.department_changes)
+            for r in hr_records
+        ))
+        
         # Performance ratings (last 2 years)
-        perf_ratings = [r.performance_rating for r in hr_records if r.performance_rating]
-        performance_rating_avg = np.mean(perf_ratings) if perf_ratings else 3.0
+        perf_ratings = [float(v) for v in perf_col if v]
+        performance_rating_avg = fmean(perf_ratings) if perf_ratings else 3.0
         
         # Performance trend
         if len(perf_ratings) >= 2:
@@ -78,7 +180,7 @@ class ChurnPredictionTools:
             performance_rating_trend = 0.0
         
         # Engagement scores
-        eng_scores = [r.engagement_score for r in hr_records if r.engagement_score]
+        eng_scores = [float(v) for v in eng_col if v]
         engagement_score_latest = eng_scores[0] if eng_scores else 3.0
         
         # Engagement trend
@@ -88,16 +190,16 @@ class ChurnPredictionTools:
             engagement_score_trend = 0.0
         
         # Manager and department changes (last 2 years)
-        manager_changes = sum(1 for r in hr_records if r.manager_changes) or 0
-        department_changes = sum(1 for r in hr_records if r.department_changes) or 0
+        manager_changes = sum(1 for v in manager_col if v)
+        department_changes = sum(1 for v in department_col if v)
         
         # Calculate salary change (last year)
-        salary_changes = [r.salary_change_percent for r in hr_records[:12] if r.salary_change_percent]
-        salary_change_percent_1y = np.mean(salary_changes) if salary_changes else 5.0
+        salary_changes = [float(v) for v in salary_col[:12] if v]
+        salary_change_percent_1y = fmean(salary_changes) if salary_changes else 5.0
         
         # Overtime average
-        overtime_values = [r.overtime_hours for r in hr_records if r.overtime_hours]
-        overtime_hours_avg = np.mean(overtime_values) if overtime_values else 10.0
+        overtime_values = [float(v) for v in overtime_col if v]
+        overtime_hours_avg = fmean(overtime_values) if overtime_values else 10.0
         
         # Build feature dictionary
         features = {
@@ -142,13 +244,55 @@ class ChurnPredictionTools:
             return {"error": "Model not available"}
         
         # Prepare feature vector
-        feature_names = cls._metadata['feature_names']
-        X = np.array([[features.get(name, 0) for name in feature_names]])
+        feature_vector = tuple(features.get(name, 0) for name in cls._feature_names)
         
         # Make prediction
-        probability = float(cls._model.predict_proba(X)[0][1])
-        prediction = int(cls._model.predict(X)[0])
+        probability, prediction = cls._predict_vector(feature_vector)
+        
+        return cls._build_prediction(features, probability, prediction)
+    
+    @classmethod
+    def predict_churn_batch(cls, features_list: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+        """
+        Predict churn probability for several feature sets with one model call
+        
+        Args:
+            features_list: Feature dictionaries, one per employee
+            
+        Returns:
+            Prediction results in the same order as features_list
+        """
+        # Load model if not loaded
+        if not cls.load_model():
+            return [{"error": "Model not available"} for _ in features_list]
+        
+        if not features_list:
+            return []
         
+        probabilities = cls._model_probabilities(features_list)
+        
+        return [
+            cls._build_prediction(features, float(probability), cls._predicted_class(probability))
+            for features, probability in zip(features_list, probabilities)
+        ]
+    
+    @classmethod
+    def _model_probabilities(cls, features_list: List[Dict[str, float]]) -> np.ndarray:
+        """Churn probabilities for several feature sets from one model call (model must be loaded)"""
+        # Stack all feature vectors into one matrix
+        feature_names = cls._feature_names
+        X = np.fromiter(
+            (features.get(name, 0) for features in features_list for name in feature_names),
+            dtype=float,
+            count=len(features_list) * len(feature_names)
+        ).reshape(len(features_list), len(feature_names))
+        
+        # Make predictions for every row at once
+        return cls._model.predict_proba(X)[:, 1]
+    
+    @classmethod
+    def _build_prediction(cls, features: Dict[str, float], probability: float, prediction: int) -> Dict[str, Any]:
+        """Assemble a prediction result from the model's output for one feature set"""
         # Determine risk category
         if probability >= 0.7:
             risk_category = "High"
@@ -160,11 +304,8 @@ class ChurnPredictionTools:
             risk_category = "Low"
             risk_level = 1
         
-        # Get feature importance
-        feature_importance = cls._metadata.get('feature_importance', {})
-        
         # Calculate top contributing factors for this prediction
-        top_factors = cls._get_top_risk_factors(features, feature_importance)
+        top_factors = cls._get_top_risk_factors(features)
         
         return {
             'success': True,
@@ -181,32 +322,33 @@ class ChurnPredictionTools:
         }
     
     @classmethod
-    def _get_top_risk_factors(cls, features: Dict[str, float], feature_importance: Dict[str, float], top_n: int = 5) -> List[Dict[str, Any]]:
+    @lru_cache(maxsize=4096)
+    def _predict_vector(cls, feature_vector: Tuple[float, ...]) -> Tuple[float, int]:
+        """Churn probability and class for one feature vector; memoized since the model is fixed once loaded"""
+        probability = cls._model.predict_proba(np.array([feature_vector]))[0][1]
+        return float(probability), cls._predicted_class(probability)
+    
+    @staticmethod
+    def _predicted_class(probability: float) -> int:
+        """Class the binary classifier predicts for a churn probability (same threshold as model.predict)"""
+        return int(probability > 0.5)
+    
+    @classmethod
+    def _get_top_risk_factors(cls, features: Dict[str, float]) -> List[Dict[str, Any]]:
         """Get top contributing factors to churn risk"""
         factors = []
         
         # Get top important features
-        for feature_name, importance in list(feature_importance.items())[:top_n]:
+        for feature_name, importance, indicator in cls._top_risk_features:
             value = features.get(feature_name, 0)
             
             # Determine if this feature increases or decreases risk
-            risk_indicators = {
-                'months_since_last_promotion': lambda x: x > 24,
-                'salary_change_percent_1y': lambda x: x < 5,
-                'performance_rating_trend': lambda x: x < 0,
-                'engagement_score_latest': lambda x: x < 3.5,
-                'engagement_score_trend': lambda x: x < 0,
-                'manager_changes': lambda x: x > 1,
-                'sick_days_ytd': lambda x: x > 10,
-                'training_hours_ytd': lambda x: x < 30
-            }
-            
-            is_risk_factor = risk_indicators.get(feature_name, lambda x: False)(value)
+            is_risk_factor = indicator is not None and indicator[0](value, indicator[1])
             
             factors.append({
                 'feature': feature_name,
                 'value': round(value, 2),
-                'importance': round(importance, 3),
+                'importance': importance,
                 'is_risk_factor': is_risk_factor
             })
         
@@ -230,16 +372,131 @@ class ChurnPredictionTools:
         if 'error' in feature_result:
             return feature_result
         
-        # Make prediction
-        prediction_result = cls.predict_churn(feature_result['features'])
+        # Make prediction, reusing a stored one when the features haven't changed
+        return cls.predict_employees_churn([feature_result], db)[0]
+    
+    @classmethod
+    def predict_employees_churn(
+        cls,
+        feature_results: List[Dict[str, Any]],
+        db: Optional[Session] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        End-to-end churn prediction for several employees with one model call
+        
+        Args:
+            feature_results: Successful extract_employee_features results
+            db: Database session for the stored prediction cache (optional)
+            
+        Returns:
+            Complete prediction results in the same order as feature_results
+        """
+        if db is None:
+            prediction_results = cls.predict_churn_batch([result['features'] for result in feature_results])
+        elif not cls.load_model():
+            prediction_results = [{"error": "Model not available"} for _ in feature_results]
+        else:
+            prediction_results = [
+                cls._build_prediction(result['features'], probability, cls._predicted_class(probability))
+                for result, probability in zip(feature_results, cls._cached_probabilities(feature_results, db))
+            ]
+        
+        return [
+            prediction_result if 'error' in prediction_result
+            else cls._combine_results(feature_result, prediction_result)
+            for feature_result, prediction_result in zip(feature_results, prediction_results)
+        ]
+    
+    @classmethod
+    def _cached_probabilities(cls, feature_results: List[Dict[str, Any]], db: Session) -> List[float]:
+        """
+        Churn probabilities for several employees, reusing stored predictions whose features still match
+        New predictions are made in one model call and stored for later requests
         
-        if 'error' in prediction_result:
-            return prediction_result
+        Args:
+            feature_results: Successful extract_employee_features results
+            db: Database session
+            
+        Returns:
+            Probabilities in the same order as feature_results
+        """
+        keys = [(result['employee_id'], cls._feature_hash(result['features'])) for result in feature_results]
         
-        # Combine results
+        # The cache has a session of its own so the caller's transaction is never
+        # committed or rolled back here
+        with Session(bind=db.get_bind()) as cache_db:
+            try:
+                stored = cache_db.query(
+                    ChurnPrediction.employee_id, ChurnPrediction.feature_hash, ChurnPrediction.probability
+                ).filter(
+                    ChurnPrediction.employee_id.in_([employee_id for employee_id, _ in keys]),
+                    ChurnPrediction.created_at >= datetime.utcnow() - cls.PREDICTION_CACHE_TTL
+                ).all()
+                cache_available = True
+            except SQLAlchemyError:
+                # Prediction cache table not created yet; predict everything
+                cache_db.rollback()
+                stored = []
+                cache_available = False
+            
+            probabilities = {(row.employee_id, row.feature_hash): row.probability for row in stored}
+            missing = [i for i, key in enumerate(keys) if key not in probabilities]
+            
+            if missing:
+                new_probabilities = cls._model_probabilities([feature_results[i]['features'] for i in missing])
+                for i, probability in zip(missing, new_probabilities):
+                    probabilities[keys[i]] = float(probability)
+                
+                if cache_available:
+                    entries = [(keys[i][0], keys[i][1], probabilities[keys[i]]) for i in missing]
+                    try:
+                        if cls._has_uncommitted_writes(db):
+                            # The caller holds SQLite's write lock; store inside its transaction
+                            # (kept only if it commits) rather than waiting on the lock
+                            with db.begin_nested():
+                                cls._store_predictions(entries, db)
+                        else:
+                            cls._store_predictions(entries, cache_db)
+                            cache_db.commit()
+                    except SQLAlchemyError as e:
+                        cache_db.rollback()
+                        print(f"⚠ Could not store churn predictions: {e}")
+        
+        return [probabilities[key] for key in keys]
+    
+    @staticmethod
+    def _store_predictions(entries: List[Tuple[int, str, float]], db: Session) -> None:
+        """Replace the stored predictions of these (employee_id, feature_hash, probability) entries"""
+        db.query(ChurnPrediction).filter(
+            ChurnPrediction.employee_id.in_([employee_id for employee_id, _, _ in entries])
+        ).delete(synchronize_session=False)
+        db.add_all(
+            ChurnPrediction(employee_id=employee_id, feature_hash=feature_hash, probability=probability)
+            for employee_id, feature_hash, probability in entries
+        )
+    
+    @staticmethod
+    def _has_uncommitted_writes(db: Session) -> bool:
+        """Whether the session's connection has an open write transaction (SQLite begins one at the first write)"""
+        if not db.in_transaction():
+            return False
+        return bool(getattr(db.connection().connection.dbapi_connection, 'in_transaction', False))
+    
+    @classmethod
+    def _feature_hash(cls, features: Dict[str, float]) -> str:
+        """Hash of the model version and feature values identifying a stored prediction"""
+        key = "|".join([
+            str(cls._metadata.get('trained_date')),
+            *(f"{float(features.get(name, 0)):.6f}" for name in cls._feature_names)
+        ])
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    
+    @staticmethod
+    def _combine_results(feature_result: Dict[str, Any], prediction_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine extracted features and their prediction into one result"""
         return {
             'success': True,
-            'employee_id': employee_id,
+            'employee_id': feature_result['employee_id'],
             'employee_name': feature_result['employee_name'],
             'prediction': prediction_result['prediction'],
             'probability': prediction_result['probability'],
@@ -263,27 +520,45 @@ class ChurnPredictionTools:
             List of high-risk employees
         """
         # Get all active employees
-        from src.database.models import Employee
         employees = db.query(Employee).filter(
             Employee.employment_status == 'active'
         ).all()
         
-        high_risk_employees = []
-        
+        # Extract features for every employee, then predict them all in one batch
+        feature_results = []
+        hr_records_by_employee = cls._hr_records_by_employee([e.employee_id for e in employees], db)
         for employee in employees:
             try:
-                result = cls.predict_employee_churn(employee.employee_id, db)
-                
-                if result.get('success') and result.get('probability', 0) >= min_probability:
-                    high_risk_employees.append({
-                        'employee_id': result['employee_id'],
-                        'employee_name': result['employee_name'],
-                        'probability': result['probability'],
-                        'risk_category': result['risk_category'],
-                        'top_factor': result['top_factors'][0] if result['top_factors'] else None
-                    })
-            except Exception as e:
+                feature_result = cls._features_from_records(
+                    employee, hr_records_by_employee.get(employee.employee_id, [])
+                )
+            except Exception:
+                # Skip employees without sufficient data
                 continue
+            if 'error' not in feature_result:
+                feature_results.append(feature_result)
+        
+        try:
+            results = cls.predict_employees_churn(feature_results, db)
+        except Exception as e:
+            # A failed batch means no employee was scored; don't report "no high-risk employees"
+            print(f"⚠ Churn prediction failed for {len(feature_results)} employees: {e}")
+            return {
+                'success': False,
+                'error': f"Churn prediction failed: {e}"
+            }
+        
+        high_risk_employees = []
+        
+        for result in results:
+            if result.get('success') and result.get('probability', 0) >= min_probability:
+                high_risk_employees.append({
+                    'employee_id': result['employee_id'],
+                    'employee_name': result['employee_name'],
+                    'probability': result['probability'],
+                    'risk_category': result['risk_category'],
+                    'top_factor': result['top_factors'][0] if result['top_factors'] else None
+                })
         
         # Sort by probability
         high_risk_employees.sort(key=lambda x: x['probability'], reverse=True)
@@ -308,8 +583,6 @@ class ChurnPredictionTools:
         Returns:
             Department churn analysis with predictions for all employees
         """
-        from src.database.models import Employee
-        
         # Get all employees in department
         employees = db.query(Employee).filter(
             Employee.department == department
@@ -327,37 +600,62 @@ class ChurnPredictionTools:
         low_risk_count = 0
         total_probability = 0.0
         
+        # Extract features for every employee, then predict them all in one batch
+        feature_results = []
+        errors = []
+        hr_records_by_employee = cls._hr_records_by_employee([e.employee_id for e in employees], db)
         for employee in employees:
             try:
-                result = cls.predict_employee_churn(employee.employee_id, db)
-                
-                if result.get('success'):
-                    predictions.append({
-                        'employee_id': result['employee_id'],
-                        'employee_name': result['employee_name'],
-                        'probability': result['probability'],
-                        'risk_category': result['risk_category'],
-                        'risk_level': result['risk_level'],
-                        'top_factors': result['top_factors'][:3]  # Top 3 factors
-                    })
-                    
-                    total_probability += result['probability']
-                    
-                    # Count by risk category
-                    if result['risk_category'] == 'High':
-                        high_risk_count += 1
-                    elif result['risk_category'] == 'Medium':
-                        medium_risk_count += 1
-                    else:
-                        low_risk_count += 1
-                        
+                feature_result = cls._features_from_records(
+                    employee, hr_records_by_employee.get(employee.employee_id, [])
+                )
             except Exception as e:
                 # Skip employees without sufficient data
-                predictions.append({
+                errors.append({
                     'employee_id': employee.employee_id,
                     'employee_name': employee.full_name,
                     'error': str(e)
                 })
+                continue
+            if 'error' not in feature_result:
+                feature_results.append(feature_result)
+        
+        try:
+            results = cls.predict_employees_churn(feature_results, db)
+        except Exception as e:
+            print(f"⚠ Churn prediction failed for department {department}: {e}")
+            results = []
+            errors.extend(
+                {
+                    'employee_id': feature_result['employee_id'],
+                    'employee_name': feature_result['employee_name'],
+                    'error': str(e)
+                }
+                for feature_result in feature_results
+            )
+        
+        for result in results:
+            if result.get('success'):
+                predictions.append({
+                    'employee_id': result['employee_id'],
+                    'employee_name': result['employee_name'],
+                    'probability': result['probability'],
+                    'risk_category': result['risk_category'],
+                    'risk_level': result['risk_level'],
+                    'top_factors': result['top_factors'][:3]  # Top 3 factors
+                })
+                
+                total_probability += result['probability']
+                
+                # Count by risk category
+                if result['risk_category'] == 'High':
+                    high_risk_count += 1
+                elif result['risk_category'] == 'Medium':
+                    medium_risk_count += 1
+                else:
+                    low_risk_count += 1
+        
+        predictions.extend(errors)
         
         # Sort by probability (highest risk first)
         predictions_with_prob = [p for p in predictions if 'probability' in p]
@@ -368,24 +666,22 @@ class ChurnPredictionTools:
         avg_probability = total_probability / len(predictions_with_prob) if predictions_with_prob else 0.0
         
         # Identify common risk factors across department
-        all_factors = {}
+        factor_counts = Counter(
+            factor['feature'] for pred in predictions_with_prob for factor in pred.get('top_factors', ())
+        )
+        importance_sums = defaultdict(float)
         for pred in predictions_with_prob:
-            if 'top_factors' in pred:
-                for factor in pred['top_factors']:
-                    feature = factor['feature']
-                    if feature not in all_factors:
-                        all_factors[feature] = {'count': 0, 'importance_sum': 0.0}
-                    all_factors[feature]['count'] += 1
-                    all_factors[feature]['importance_sum'] += factor['importance']
+            for factor in pred.get('top_factors', ()):
+                importance_sums[factor['feature']] += factor['importance']
         
         # Get top common risk factors
         common_factors = [
             {
                 'feature': feature,
-                'affected_employees': data['count'],
-                'avg_importance': data['importance_sum'] / data['count']
+                'affected_employees': count,
+                'avg_importance': importance_sums[feature] / count
             }
-            for feature, data in all_factors.items()
+            for feature, count in factor_counts.items()
         ]
         common_factors.sort(key=lambda x: x['affected_employees'], reverse=True)
         
@@ -3,23 +3,62 @@ Procurement Forecasting Tools
 Combines asset health tracking and churn predictions to forecast asset procurement needs
 """
 
+import threading
+from bisect import bisect_right
+from itertools import product
+from operator import itemgetter
 from typing import Dict, List, Any
+from cachetools import TTLCache
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from collections import defaultdict
+from src.database.models import Asset, Employee
+from src.agent.tool.tools import EmployeeLifecycleTools, asset_data_version
+from src.agent.tool.churn_prediction_tools import ChurnPredictionTools
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Demand analyses are reused for repeated reports (dashboards, agent retries);
+# keys include the asset data version so asset writes start a fresh entry
+DEMAND_CACHE_TTL_SECONDS = 60
+_demand_cache = TTLCache(maxsize=32, ttl=DEMAND_CACHE_TTL_SECONDS)
+_demand_cache_lock = threading.Lock()
+
+
+def _priority_for(urgent_refresh: bool, shortage_bucket: int, demand_bucket: int) -> str:
+    """Priority rule behind ProcurementForecastingTools.PRIORITY_TABLE"""
+    if shortage_bucket == 0:
+        return "NONE"
+    # High priority if urgent refresh needed or significant shortage
+    if urgent_refresh or shortage_bucket == 3:
+        return "HIGH"
+    if shortage_bucket == 2 or demand_bucket == 1:
+        return "MEDIUM"
+    return "LOW"
+
 
 class ProcurementForecastingTools:
     """Tools for forecasting asset procurement needs"""
     
+    # Shortage buckets: 0 | 1 | 2-4 | 5+; total demand buckets: <3 | 3+
+    SHORTAGE_THRESHOLDS = (1, 2, 5)
+    DEMAND_THRESHOLDS = (3,)
+    
+    # Priority by (urgent refresh needed, shortage bucket, total demand bucket)
+    PRIORITY_TABLE = {
+        key: _priority_for(*key)
+        for key in product((False, True), range(len(SHORTAGE_THRESHOLDS) + 1), range(len(DEMAND_THRESHOLDS) + 1))
+    }
+    PRIORITY_RANK = {"NONE": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3}
+    
     @classmethod
     def calculate_asset_demand(
         cls,
         db: Session,
-        forecast_months: int = 6
+        forecast_months: int = 6,
+        include_details: bool = True
     ) -> Dict[str, Any]:
         """
         Calculate total asset demand based on:
@@ -29,14 +68,28 @@ class ProcurementForecastingTools:
         Args:
             db: Database session
             forecast_months: Number of months to forecast (default 6 for churn prediction window)
+            include_details: Build the per-asset and per-employee lists (left empty otherwise)
             
         Returns:
             Dictionary with asset demand breakdown
         """
-        from src.agent.tool.tools import EmployeeLifecycleTools
-        from src.agent.tool.churn_prediction_tools import ChurnPredictionTools
-        from src.database.models import Asset, Employee
+        key = (str(db.get_bind().url), forecast_months, include_details, asset_data_version())
+        with _demand_cache_lock:
+            result = _demand_cache.get(key)
+        
+        if result is None:
+            result = cls._compute_asset_demand(db, forecast_months, include_details)
+            if result.get('success'):
+                with _demand_cache_lock:
+                    _demand_cache[key] = result
+        else:
+            logger.info(f"Using cached asset demand for {forecast_months} months")
         
+        return dict(result)
+    
+    @classmethod
+    def _compute_asset_demand(cls, db: Session, forecast_months: int, include_details: bool) -> Dict[str, Any]:
+        """Calculate asset demand without consulting the cache"""
         logger.info(f"Calculating asset demand for {forecast_months} months")
         
         # 1. Get assets needing refresh (>3 years old)
@@ -53,75 +106,87 @@ class ProcurementForecastingTools:
         refresh_by_type = defaultdict(lambda: {'urgent': 0, 'recommended': 0, 'assets': []})
         
         for asset in refresh_assets:
-            device_type = asset['device_type']
             age_years = asset['age_years']
+            urgent = age_years >= 5
             
-            if age_years >= 5:
-                refresh_by_type[device_type]['urgent'] += 1
-            else:
-                refresh_by_type[device_type]['recommended'] += 1
-            
-            refresh_by_type[device_type]['assets'].append({
-                'asset_id': asset['asset_id'],
-                'asset_tag': asset['asset_tag'],
-                'age_years': age_years,
-                'assigned_to': asset['assigned_to'],
-                'priority': 'URGENT' if age_years >= 5 else 'RECOMMENDED'
-            })
+            by_type = refresh_by_type[asset['device_type']]
+            by_type['urgent' if urgent else 'recommended'] += 1
+            if include_details:
+                by_type['assets'].append({
+                    'asset_id': asset['asset_id'],
+                    'asset_tag': asset['asset_tag'],
+                    'age_years': age_years,
+                    'assigned_to': asset['assigned_to'],
+                    'priority': 'URGENT' if urgent else 'RECOMMENDED'
+                })
         
         # 2. Get high-risk employees (likely to resign within 6 months)
         high_risk_employees = ChurnPredictionTools.get_high_risk_employees(db, min_probability=0.7)
         
         churn_assets_by_type = defaultdict(int)
         churn_employees_detail = []
+        high_risk_count = 0
         
         if high_risk_employees.get('success'):
-            for emp in high_risk_employees.get('high_risk_employees', []):
-                employee_id = emp['employee_id']
-                
-                # Get assets assigned to this employee
-                assigned_assets = db.query(Asset).filter(
-                    Asset.assigned_to == employee_id,
+            at_risk = high_risk_employees.get('high_risk_employees', [])
+            high_risk_count = len(at_risk)
+            
+            employee_ids = [emp['employee_id'] for emp in at_risk]
+            
+            if employee_ids and not include_details:
+                # Only the per-type counts are needed; aggregate them in SQL
+                churn_assets_by_type.update(db.query(
+                    Asset.device_type, func.count(Asset.asset_id)
+                ).filter(
+                    Asset.assigned_to.in_(employee_ids),
                     Asset.status == 'assigned'
-                ).all()
+                ).group_by(Asset.device_type).all())
+            
+            elif employee_ids:
+                # Get assets assigned to all high-risk employees in one query
+                assets_by_employee = defaultdict(list)
+                for asset in db.query(
+                    Asset.assigned_to, Asset.asset_id, Asset.asset_tag,
+                    Asset.device_type, Asset.brand, Asset.model
+                ).filter(
+                    Asset.assigned_to.in_(employee_ids),
+                    Asset.status == 'assigned'
+                ).all():
+                    assets_by_employee[asset.assigned_to].append(asset)
                 
-                employee_assets = []
-                for asset in assigned_assets:
-                    churn_assets_by_type[asset.device_type] += 1
-                    employee_assets.append({
-                        'asset_id': asset.asset_id,
-                        'asset_tag': asset.asset_tag,
-                        'device_type': asset.device_type,
-                        'brand': asset.brand,
-                        'model': asset.model
+                for emp in at_risk:
+                    employee_id = emp['employee_id']
+                    
+                    employee_assets = []
+                    for asset in assets_by_employee[employee_id]:
+                        churn_assets_by_type[asset.device_type] += 1
+                        employee_assets.append({
+                            'asset_id': asset.asset_id,
+                            'asset_tag': asset.asset_tag,
+                            'device_type': asset.device_type,
+                            'brand': asset.brand,
+                            'model': asset.model
+                        })
+                    
+                    churn_employees_detail.append({
+                        'employee_id': employee_id,
+                        'employee_name': emp['employee_name'],
+                        'churn_probability': emp['probability'],
+                        'assets': employee_assets,
+                        'asset_count': len(employee_assets)
                     })
-                
-                churn_employees_detail.append({
-                    'employee_id': employee_id,
-                    'employee_name': emp['employee_name'],
-                    'churn_probability': emp['probability'],
-                    'assets': employee_assets,
-                    'asset_count': len(employee_assets)
-                })
-        
-        # 3. Calculate total demand by device type
-        total_demand_by_type = defaultdict(lambda: {
-            'refresh_needed': 0,
-            'churn_replacement': 0,
-            'total_demand': 0
-        })
         
-        for device_type, data in refresh_by_type.items():
-            total_demand_by_type[device_type]['refresh_needed'] = data['urgent'] + data['recommended']
-        
-        for device_type, count in churn_assets_by_type.items():
-            total_demand_by_type[device_type]['churn_replacement'] = count
-        
-        for device_type in total_demand_by_type:
-            total_demand_by_type[device_type]['total_demand'] = (
-                total_demand_by_type[device_type]['refresh_needed'] +
-                total_demand_by_type[device_type]['churn_replacement']
-            )
+        # 3. Calculate total demand by device type (refresh types first, then churn-only types)
+        total_demand_by_type = {}
+        for device_type in dict.fromkeys([*refresh_by_type, *churn_assets_by_type]):
+            refresh = refresh_by_type.get(device_type)
+            refresh_needed = refresh['urgent'] + refresh['recommended'] if refresh else 0
+            churn_replacement = churn_assets_by_type.get(device_type, 0)
+            total_demand_by_type[device_type] = {
+                'refresh_needed': refresh_needed,
+                'churn_replacement': churn_replacement,
+                'total_demand': refresh_needed + churn_replacement
+            }
         
         return {
             'success': True,
@@ -140,12 +205,12 @@ class ProcurementForecastingTools:
                 }
             },
             'churn_replacement': {
-                'high_risk_employees': len(churn_employees_detail),
+                'high_risk_employees': high_risk_count,
                 'total_assets_at_risk': sum(churn_assets_by_type.values()),
                 'by_type': dict(churn_assets_by_type),
                 'employee_details': churn_employees_detail
             },
-            'total_demand': dict(total_demand_by_type)
+            'total_demand': total_demand_by_type
         }
     
     @classmethod
@@ -153,7 +218,8 @@ class ProcurementForecastingTools:
         cls,
         db: Session,
         forecast_months: int = 6,
-        safety_stock_percent: float = 0.2
+        safety_stock_percent: float = 0.2,
+        include_details: bool = True
     ) -> Dict[str, Any]:
         """
         Generate procurement recommendations based on demand vs available stock
@@ -162,38 +228,25 @@ class ProcurementForecastingTools:
             db: Database session
             forecast_months: Number of months to forecast
             safety_stock_percent: Additional buffer stock (e.g., 0.2 = 20% extra)
+            include_details: Include per-asset and per-employee lists in demand_details
             
         Returns:
             Dictionary with procurement recommendations
         """
-        from src.database.models import Asset
-        
         logger.info("Generating procurement recommendations")
         
         # 1. Calculate demand
-        demand_analysis = cls.calculate_asset_demand(db, forecast_months)
+        demand_analysis = cls.calculate_asset_demand(db, forecast_months, include_details)
         
         if not demand_analysis.get('success'):
             return demand_analysis
         
         # 2. Get available stock by device type
-        available_assets = db.query(Asset).filter(
+        available_by_type = defaultdict(int, db.query(
+            Asset.device_type, func.count(Asset.asset_id)
+        ).filter(
             Asset.status == 'available'
-        ).all()
-        
-        available_by_type = defaultdict(lambda: {'count': 0, 'assets': []})
-        
-        for asset in available_assets:
-            device_type = asset.device_type
-            available_by_type[device_type]['count'] += 1
-            available_by_type[device_type]['assets'].append({
-                'asset_id': asset.asset_id,
-                'asset_tag': asset.asset_tag,
-                'brand': asset.brand,
-                'model': asset.model,
-                'condition': asset.condition,
-                'age_years': round((datetime.now().date() - asset.purchase_date).days / 365.25, 1)
-            })
+        ).group_by(Asset.device_type).all())
         
         # 3. Calculate procurement needs
         procurement_recommendations = []
@@ -201,13 +254,14 @@ class ProcurementForecastingTools:
         
         for device_type, demand_data in total_demand.items():
             total_needed = demand_data['total_demand']
-            available_count = available_by_type[device_type]['count']
+            available_count = available_by_type[device_type]
             
             # Add safety stock buffer
             total_needed_with_buffer = int(total_needed * (1 + safety_stock_percent))
             
             shortage = max(0, total_needed_with_buffer - available_count)
             surplus = max(0, available_count - total_needed_with_buffer)
+            priority = cls._calculate_priority(demand_data, shortage)
             
             recommendation = {
                 'device_type': device_type,
@@ -225,20 +279,21 @@ class ProcurementForecastingTools:
                 },
                 'action_required': shortage > 0,
                 'purchase_quantity': shortage,
-                'priority': cls._calculate_priority(demand_data, shortage),
+                'priority': priority,
                 'estimated_timeline': f"{forecast_months} months",
                 'recommendation': cls._generate_recommendation_message(
                     device_type, shortage, surplus, demand_data
-                )
+                ),
+                # Sort key only; removed after sorting
+                '_sort_key': (shortage > 0, cls.PRIORITY_RANK[priority], shortage)
             }
             
             procurement_recommendations.append(recommendation)
         
         # Sort by priority (highest first)
-        procurement_recommendations.sort(
-            key=lambda x: (x['action_required'], x['priority'], x['purchase_quantity']),
-            reverse=True
-        )
+        procurement_recommendations.sort(key=itemgetter('_sort_key'), reverse=True)
+        for recommendation in procurement_recommendations:
+            del recommendation['_sort_key']
         
         # Generate summary message
         urgent_purchases = [r for r in procurement_recommendations if r['action_required']]
@@ -264,28 +319,17 @@ class ProcurementForecastingTools:
             'summary_message': summary_message,
             'recommendations': procurement_recommendations,
             'demand_details': demand_analysis,
-            'available_inventory': {
-                device_type: data['count']
-                for device_type, data in available_by_type.items()
-            }
+            'available_inventory': dict(available_by_type)
         }
     
     @classmethod
     def _calculate_priority(cls, demand_data: Dict, shortage: int) -> str:
         """Calculate priority level for procurement"""
-        if shortage == 0:
-            return "NONE"
-        
-        # High priority if urgent refresh needed or significant shortage
-        urgent_refresh = demand_data.get('refresh_needed', 0)
-        total_demand = demand_data.get('total_demand', 0)
-        
-        if urgent_refresh > 0 or shortage >= 5:
-            return "HIGH"
-        elif shortage >= 2 or total_demand >= 3:
-            return "MEDIUM"
-        else:
-            return "LOW"
+        return cls.PRIORITY_TABLE[(
+            demand_data.get('refresh_needed', 0) > 0,
+            bisect_right(cls.SHORTAGE_THRESHOLDS, shortage),
+            bisect_right(cls.DEMAND_THRESHOLDS, demand_data.get('total_demand', 0))
+        )]
     
     @classmethod
     def _generate_recommendation_message(
@@ -331,15 +375,15 @@ class ProcurementForecastingTools:
         logger.info("Generating comprehensive procurement report")
         
         # Get recommendations
-        recommendations = cls.get_procurement_recommendations(db)
+        recommendations = cls.get_procurement_recommendations(db, include_details=include_details)
         
         if not recommendations.get('success'):
             return recommendations
         
-        # Build report
+        # Build report (stamped with the same timestamp as its recommendations)
         report = {
             'success': True,
-            'report_date': datetime.now().isoformat(),
+            'report_date': recommendations['forecast_date'],
             'forecast_period': f"{recommendations['forecast_period_months']} months",
             'executive_summary': {
                 'procurement_needed': not recommendations['summary']['inventory_sufficient'],
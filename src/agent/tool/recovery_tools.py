@@ -2,10 +2,13 @@
 Tools for Asset Recovery Agent
 """
 
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, aliased
 from src.database.models import Employee, Asset
-from datetime import datetime, timedelta
+from src.agent.tool.tools import invalidate_employee_assets
+from datetime import date, timedelta
 
 
 class AssetRecoveryTools:
@@ -38,7 +41,7 @@ class AssetRecoveryTools:
             "employee_name": employee.full_name,
             "employee_email": employee.email,
             "manager_id": employee.manager_id,
-            "resignation_date": employee.resignation_date.isoformat() if employee.resignation_date else None,
+            "resignation_date": employee.resignation_date,
             "employment_status": employee.employment_status,
             "total_assets": len(assets),
             "assets": [
@@ -84,35 +87,46 @@ class AssetRecoveryTools:
     @staticmethod
     def schedule_asset_returns(
         employee_id: int,
-        return_due_date: str,
-        db: Session
+        return_due_date: date,
+        db: Session,
+        asset_ids: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Schedule asset returns for an employee
         
         Args:
             employee_id: Employee ID
-            return_due_date: Return due date (ISO format)
+            return_due_date: Return due date
             db: Database session
+            asset_ids: Already-fetched IDs of the employee's assigned assets (optional)
             
         Returns:
             Dictionary with update results
         """
         try:
-            due_date = datetime.fromisoformat(return_due_date).date()
-            
-            assets = db.query(Asset).filter(
-                Asset.assigned_to == employee_id,
-                Asset.status == "assigned"
-            ).all()
-            
-            updated_count = 0
-            for asset in assets:
-                asset.return_due_date = due_date
-                asset.status = "assigned"  # Keep assigned but with return due date
-                updated_count += 1
+            if asset_ids is not None:
+                # Assets were fetched by the caller; update them in one statement
+                # (they stay assigned, just with a return due date)
+                updated_count = 0
+                if asset_ids:
+                    result = db.execute(
+                        update(Asset)
+                        .where(Asset.asset_id.in_(asset_ids), Asset.status == "assigned")
+                        .values(return_due_date=return_due_date)
+                        .execution_options(synchronize_session=False)
+                    )
+                    updated_count = result.rowcount
+            else:
+                result = db.execute(
+                    update(Asset)
+                    .where(Asset.assigned_to == employee_id, Asset.status == "assigned")
+                    .values(return_due_date=return_due_date)
+                    .execution_options(synchronize_session=False)
+                )
+                updated_count = result.rowcount
             
             db.commit()
+            invalidate_employee_assets(employee_id)
             
             return {
                 "success": True,
@@ -130,78 +144,164 @@ class AssetRecoveryTools:
             }
     
     @staticmethod
-    def calculate_return_due_date(resignation_date: str, days: int = 7) -> str:
+    def calculate_return_due_date(resignation_date: date, days: int = 7) -> date:
         """
         Calculate return due date based on resignation date
         
         Args:
-            resignation_date: Resignation date (ISO format)
+            resignation_date: Resignation date
             days: Days to add (default 7)
             
         Returns:
-            Return due date as ISO format string
+            Return due date
         """
-        date = datetime.fromisoformat(resignation_date).date()
-        return_date = date + timedelta(days=days)
-        return return_date.isoformat()
+        return resignation_date + timedelta(days=days)
     
     @staticmethod
-    def get_resignation_summary(employee_id: int, db: Session) -> Dict[str, Any]:
+    def fetch_resignation_bundle(employee_id: int, db: Session) -> Optional[Dict[str, Any]]:
         """
-        Get resignation and asset recovery summary
+        Fetch everything a resignation needs in one joined query plus one asset query:
+        the employee, their manager and their assigned assets
         
         Args:
             employee_id: Employee ID
             db: Database session
             
         Returns:
-            Dictionary with resignation summary
+            Dictionary with plain employee, manager and asset data, or None if not found
         """
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        
-        if not employee:
-            return {"error": f"Employee {employee_id} not found"}
+        return AssetRecoveryTools.fetch_resignation_bundles([employee_id], db).get(employee_id)
+    
+    @staticmethod
+    def fetch_resignation_bundles(employee_ids: List[int], db: Session) -> Dict[int, Dict[str, Any]]:
+        """
+        Fetch resignation bundles for several employees with the same two queries
         
-        assets = db.query(Asset).filter(
-            Asset.assigned_to == employee_id,
-            Asset.status == "assigned"
+        Args:
+            employee_ids: Employee IDs
+            db: Database session
+            
+        Returns:
+            Dictionary mapping each found employee ID to its bundle
+        """
+        manager = aliased(Employee)
+        rows = db.execute(
+            select(Employee, manager)
+            .outerjoin(manager, manager.employee_id == Employee.manager_id)
+            .where(Employee.employee_id.in_(employee_ids))
         ).all()
         
+        # Assigned assets as plain rows, so the session's Employee.assets collections stay complete
+        assets_by_employee = defaultdict(list)
+        for asset in db.execute(
+            select(
+                Asset.assigned_to, Asset.asset_id, Asset.asset_tag, Asset.serial_number,
+                Asset.device_type, Asset.brand, Asset.model, Asset.condition,
+                Asset.purchase_value, Asset.current_value, Asset.return_due_date
+            ).where(Asset.assigned_to.in_(employee_ids), Asset.status == "assigned")
+        ):
+            assets_by_employee[asset.assigned_to].append(asset)
+        
+        # Copy into plain dicts so later commits don't trigger attribute reloads
+        return {
+            employee.employee_id: {
+                "employee": {
+                    "employee_id": employee.employee_id,
+                    "employee_name": employee.full_name,
+                    "employee_email": employee.email,
+                    "manager_id": employee.manager_id,
+                    "resignation_date": employee.resignation_date,
+                    "last_working_day": employee.last_working_day,
+                    "employment_status": employee.employment_status
+                },
+                "manager": {
+                    "manager_id": mgr.employee_id,
+                    "manager_name": mgr.full_name,
+                    "manager_email": mgr.email,
+                    "department": mgr.department
+                } if mgr else None,
+                "assets": [
+                    {
+                        "asset_id": a.asset_id,
+                        "asset_tag": a.asset_tag,
+                        "serial_number": a.serial_number,
+                        "device_type": a.device_type,
+                        "brand": a.brand,
+                        "model": a.model,
+                        "condition": a.condition,
+                        "purchase_value": float(a.purchase_value),
+                        "current_value": float(a.current_value),
+                        "return_due_date": a.return_due_date
+                    }
+                    for a in assets_by_employee[employee.employee_id]
+                ]
+            }
+            for employee, mgr in rows
+        }
+    
+    @staticmethod
+    def summarize_resignation(bundle: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the resignation summary from a fetched resignation bundle
+        
+        Args:
+            bundle: Result of fetch_resignation_bundle
+            
+        Returns:
+            Dictionary with resignation summary
+        """
+        employee = bundle["employee"]
+        manager = bundle["manager"]
+        assets = bundle["assets"]
+        
         # Count by type
-        assets_by_type = {}
+        assets_by_type = defaultdict(int)
         total_value = 0
         for asset in assets:
-            if asset.device_type not in assets_by_type:
-                assets_by_type[asset.device_type] = 0
-            assets_by_type[asset.device_type] += 1
-            total_value += float(asset.current_value)
-        
-        manager = None
-        if employee.manager_id:
-            manager = db.query(Employee).filter(Employee.employee_id == employee.manager_id).first()
+            assets_by_type[asset["device_type"]] += 1
+            total_value += asset["current_value"]
         
         return {
-            "employee_id": employee.employee_id,
-            "employee_name": employee.full_name,
-            "employee_email": employee.email,
-            "resignation_date": employee.resignation_date.isoformat() if employee.resignation_date else None,
-            "last_working_day": employee.last_working_day.isoformat() if employee.last_working_day else None,
-            "employment_status": employee.employment_status,
-            "manager_name": manager.full_name if manager else None,
-            "manager_email": manager.email if manager else None,
+            "employee_id": employee["employee_id"],
+            "employee_name": employee["employee_name"],
+            "employee_email": employee["employee_email"],
+            "resignation_date": employee["resignation_date"].isoformat() if employee["resignation_date"] else None,
+            "last_working_day": employee["last_working_day"].isoformat() if employee["last_working_day"] else None,
+            "employment_status": employee["employment_status"],
+            "manager_name": manager["manager_name"] if manager else None,
+            "manager_email": manager["manager_email"] if manager else None,
             "total_assets": len(assets),
-            "assets_by_type": assets_by_type,
+            "assets_by_type": dict(assets_by_type),
             "total_asset_value": round(total_value, 2),
             "assets": [
                 {
-                    "asset_tag": a.asset_tag,
-                    "device_type": a.device_type,
-                    "brand": a.brand,
-                    "model": a.model,
-                    "condition": a.condition,
-                    "current_value": float(a.current_value),
-                    "return_due_date": a.return_due_date.isoformat() if a.return_due_date else None
+                    "asset_tag": a["asset_tag"],
+                    "device_type": a["device_type"],
+                    "brand": a["brand"],
+                    "model": a["model"],
+                    "condition": a["condition"],
+                    "current_value": a["current_value"],
+                    "return_due_date": a["return_due_date"].isoformat() if a["return_due_date"] else None
                 }
                 for a in assets
             ]
         }
+    
+    @staticmethod
+    def get_resignation_summary(employee_id: int, db: Session) -> Dict[str, Any]:
+        """
+        Get resignation and asset recovery summary
+        
+        Args:
+            employee_id: Employee ID
+            db: Database session
+            
+        Returns:
+            Dictionary with resignation summary
+        """
+        bundle = AssetRecoveryTools.fetch_resignation_bundle(employee_id, db)
+        
+        if not bundle:
+            return {"error": f"Employee {employee_id} not found"}
+        
+        return AssetRecoveryTools.summarize_resignation(bundle)
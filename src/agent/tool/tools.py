@@ -4,10 +4,70 @@ Handles both asset assignment (onboarding) and asset recovery (offboarding)
 """
 
 import json
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+import threading
+from collections import defaultdict
+from typing import List, Dict, Any, Callable
+from cachetools import TTLCache
+from sqlalchemy import Integer, case, cast, func, select, update
+from sqlalchemy.orm import Session, aliased, load_only
 from src.database.models import Employee, Asset
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+
+# Short-lived cache of per-employee asset lookups made by the chatbot,
+# keyed by (employee_id, kind); write paths below drop an employee's entries
+EMPLOYEE_ASSET_CACHE_TTL_SECONDS = 30
+_employee_asset_cache = TTLCache(maxsize=512, ttl=EMPLOYEE_ASSET_CACHE_TTL_SECONDS)
+_employee_asset_cache_lock = threading.Lock()
+
+# Bumped on every asset write so caches derived from asset data as a whole
+# (e.g. procurement demand) can key on it instead of tracking employees
+_asset_data_version = 0
+
+
+def cached_employee_lookup(employee_id: int, kind: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Return a cached per-employee lookup, computing it with loader on a miss
+    
+    Args:
+        employee_id: Employee ID
+        kind: Name of the lookup (e.g. "asset_count")
+        loader: Function computing the result
+        
+    Returns:
+        Copy of the (possibly cached) result
+    """
+    key = (employee_id, kind)
+    with _employee_asset_cache_lock:
+        result = _employee_asset_cache.get(key)
+    
+    if result is None:
+        result = loader()
+        # Don't cache lookups that failed (e.g. employee not found yet)
+        if result.get("success"):
+            with _employee_asset_cache_lock:
+                _employee_asset_cache[key] = result
+    
+    return dict(result)
+
+
+def asset_data_version() -> int:
+    """Return a counter that changes whenever asset data is written"""
+    return _asset_data_version
+
+
+def invalidate_employee_assets(*employee_ids: int) -> None:
+    """Drop cached asset lookups for the given employees and bump the asset data version"""
+    global _asset_data_version
+    with _employee_asset_cache_lock:
+        _asset_data_version += 1
+    
+    ids = {employee_id for employee_id in employee_ids if employee_id is not None}
+    if not ids:
+        return
+    with _employee_asset_cache_lock:
+        for key in [key for key in _employee_asset_cache.keys() if key[0] in ids]:
+            _employee_asset_cache.pop(key, None)
 
 
 class EmployeeLifecycleTools:
@@ -75,41 +135,66 @@ class EmployeeLifecycleTools:
         Returns:
             Dictionary with available assets
         """
+        return EmployeeLifecycleTools.find_available_assets_bulk(
+            {device_type: quantity}, db
+        )[device_type]
+
+    @staticmethod
+    def find_available_assets_bulk(quantities: Dict[str, int], db: Session) -> Dict[str, Dict[str, Any]]:
+        """
+        Find available assets for several device types with a single query
+        
+        Args:
+            quantities: Number of assets needed per device type
+            db: Database session
+            
+        Returns:
+            Dictionary mapping each device type to its find_available_assets result
+        """
         # Define condition priority (higher number = better)
         condition_order = {"excellent": 3, "good": 2, "fair": 1, "poor": 0, "damaged": -1}
         
         assets = db.query(Asset).filter(
-            Asset.device_type == device_type,
+            Asset.device_type.in_(list(quantities)),
             Asset.status == "available",
             Asset.assigned_to.is_(None),
             Asset.condition.in_(["excellent", "good", "fair"])
         ).all()
         
-        # Sort by condition priority
-        assets_sorted = sorted(
-            assets,
-            key=lambda a: condition_order.get(a.condition, 0),
-            reverse=True
-        )
-        
-        available = assets_sorted[:quantity]
+        # Group by device type
+        assets_by_type = defaultdict(list)
+        for asset in assets:
+            assets_by_type[asset.device_type].append(asset)
+        
+        results = {}
+        for device_type, quantity in quantities.items():
+            # Sort by condition priority
+            assets_sorted = sorted(
+                assets_by_type[device_type],
+                key=lambda a: condition_order.get(a.condition, 0),
+                reverse=True
+            )
+            
+            available = assets_sorted[:quantity]
+            
+            results[device_type] = {
+                "device_type": device_type,
+                "requested_quantity": quantity,
+                "available_count": len(available),
+                "assets": [
+                    {
+                        "asset_id": a.asset_id,
+                        "asset_tag": a.asset_tag,
+                        "serial_number": a.serial_number,
+                        "condition": a.condition,
+                        "brand": a.brand,
+                        "model": a.model
+                    }
+                    for a in available
+                ]
+            }
         
-        return {
-            "device_type": device_type,
-            "requested_quantity": quantity,
-            "available_count": len(available),
-            "assets": [
-                {
-                    "asset_id": a.asset_id,
-                    "asset_tag": a.asset_tag,
-                    "serial_number": a.serial_number,
-                    "condition": a.condition,
-                    "brand": a.brand,
-                    "model": a.model
-                }
-                for a in available
-            ]
-        }
+        return results
 
     @staticmethod
     def assign_asset_to_employee(employee_id: int, asset_id: int, db: Session) -> Dict[str, Any]:
@@ -143,6 +228,7 @@ class EmployeeLifecycleTools:
             asset.status = "assigned"
             
             db.commit()
+            invalidate_employee_assets(employee_id)
             
             return {
                 "success": True,
@@ -157,6 +243,88 @@ class EmployeeLifecycleTools:
         except Exception as e:
             return {"error": str(e), "success": False}
 
+    @staticmethod
+    def bulk_assign_assets(employee_id: int, asset_ids: List[int], db: Session) -> Dict[str, Any]:
+        """
+        Assign several assets to an employee with a single UPDATE
+        
+        Args:
+            employee_id: Employee ID
+            asset_ids: IDs of the assets to assign
+            db: Database session
+            
+        Returns:
+            Dictionary with the assigned assets and the ones that could not be assigned
+        """
+        try:
+            employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
+            if not employee:
+                return {"error": f"Employee {employee_id} not found", "success": False}
+            
+            if not asset_ids:
+                return {"success": True, "employee_id": employee_id, "assigned": [], "failed": []}
+            
+            # Only assets that are still free get assigned
+            rows = db.query(
+                Asset.asset_id, Asset.asset_tag, Asset.device_type, Asset.condition
+            ).filter(
+                Asset.asset_id.in_(asset_ids),
+                Asset.status == "available",
+                Asset.assigned_to.is_(None)
+            ).all()
+            
+            # The guarded UPDATE decides what was actually claimed; a concurrent
+            # assignment may take some of the selected assets in between
+            claimed_ids = set()
+            if rows:
+                claimed_ids = set(db.execute(
+                    update(Asset)
+                    .where(
+                        Asset.asset_id.in_([row.asset_id for row in rows]),
+                        Asset.status == "available",
+                        Asset.assigned_to.is_(None)
+                    )
+                    .values(
+                        assigned_to=employee_id,
+                        assignment_date=datetime.now().date(),
+                        status="assigned"
+                    )
+                    .returning(Asset.asset_id)
+                    .execution_options(synchronize_session=False)
+                ).scalars().all())
+                db.commit()
+                invalidate_employee_assets(employee_id)
+            
+            assigned = [
+                {
+                    "success": True,
+                    "message": f"Asset {row.asset_tag} assigned to {employee.full_name}",
+                    "asset_id": row.asset_id,
+                    "asset_tag": row.asset_tag,
+                    "employee_id": employee_id,
+                    "employee_name": employee.full_name,
+                    "device_type": row.device_type,
+                    "condition": row.condition
+                }
+                for row in rows
+                if row.asset_id in claimed_ids
+            ]
+            failed = [
+                {"error": f"Asset {asset_id} is not available", "success": False, "asset_id": asset_id}
+                for asset_id in asset_ids
+                if asset_id not in claimed_ids
+            ]
+            
+            return {
+                "success": not failed,
+                "employee_id": employee_id,
+                "assigned": assigned,
+                "failed": failed
+            }
+        except Exception as e:
+            db.rollback()
+            return {"error": str(e), "success": False}
+
     @staticmethod
     def get_assignment_summary(employee_id: int, db: Session) -> Dict[str, Any]:
         """
@@ -174,7 +342,10 @@ class EmployeeLifecycleTools:
         if not employee:
             return {"error": f"Employee {employee_id} not found"}
         
-        assets = db.query(Asset).filter(
+        assets = db.query(Asset).options(load_only(
+            Asset.device_type, Asset.asset_tag, Asset.serial_number,
+            Asset.condition, Asset.brand, Asset.model
+        )).filter(
             Asset.assigned_to == employee_id,
             Asset.status == "assigned"
         ).all()
@@ -184,15 +355,12 @@ class EmployeeLifecycleTools:
             "employee_name": employee.full_name,
             "department": employee.department,
             "role": employee.role,
-            "total_assets": len(assets),
-            "assets_by_type": {}
+            "total_assets": len(assets)
         }
         
+        assets_by_type = defaultdict(list)
         for asset in assets:
-            if asset.device_type not in summary["assets_by_type"]:
-                summary["assets_by_type"][asset.device_type] = []
-            
-            summary["assets_by_type"][asset.device_type].append({
+            assets_by_type[asset.device_type].append({
                 "asset_tag": asset.asset_tag,
                 "serial_number": asset.serial_number,
                 "condition": asset.condition,
@@ -200,6 +368,7 @@ class EmployeeLifecycleTools:
                 "model": asset.model
             })
         
+        summary["assets_by_type"] = dict(assets_by_type)
         return summary
     
     # ===== ASSET RECOVERY TOOLS (Offboarding) =====
@@ -221,7 +390,10 @@ class EmployeeLifecycleTools:
         if not employee:
             return {"error": f"Employee {employee_id} not found"}
         
-        assets = db.query(Asset).filter(
+        assets = db.query(
+            Asset.asset_id, Asset.asset_tag, Asset.serial_number, Asset.device_type, Asset.brand,
+            Asset.model, Asset.condition, Asset.purchase_value, Asset.current_value
+        ).filter(
             Asset.assigned_to == employee_id,
             Asset.status == "assigned"
         ).all()
@@ -294,18 +466,17 @@ class EmployeeLifecycleTools:
         try:
             due_date = datetime.fromisoformat(return_due_date).date()
             
-            assets = db.query(Asset).filter(
-                Asset.assigned_to == employee_id,
-                Asset.status == "assigned"
-            ).all()
-            
-            updated_count = 0
-            for asset in assets:
-                asset.return_due_date = due_date
-                asset.status = "assigned"  # Keep assigned but with return due date
-                updated_count += 1
+            # Assets stay assigned, just with a return due date
+            result = db.execute(
+                update(Asset)
+                .where(Asset.assigned_to == employee_id, Asset.status == "assigned")
+                .values(return_due_date=due_date)
+                .execution_options(synchronize_session=False)
+            )
+            updated_count = result.rowcount
             
             db.commit()
+            invalidate_employee_assets(employee_id)
             
             return {
                 "success": True,
@@ -350,29 +521,35 @@ class EmployeeLifecycleTools:
         Returns:
             Dictionary with resignation summary
         """
-        employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
-        
-        if not employee:
+        # Load the employee and manager in one join
+        manager = aliased(Employee)
+        row = db.execute(
+            select(Employee, manager)
+            .outerjoin(manager, manager.employee_id == Employee.manager_id)
+            .where(Employee.employee_id == employee_id)
+        ).first()
+        
+        if not row:
             return {"error": f"Employee {employee_id} not found"}
         
-        assets = db.query(Asset).filter(
+        employee, manager = row
+        
+        # Assigned assets as plain rows; Employee.assets is left untouched
+        assets = db.query(
+            Asset.asset_tag, Asset.device_type, Asset.brand, Asset.model,
+            Asset.condition, Asset.current_value, Asset.return_due_date
+        ).filter(
             Asset.assigned_to == employee_id,
             Asset.status == "assigned"
         ).all()
         
         # Count by type
-        assets_by_type = {}
+        assets_by_type = defaultdict(int)
         total_value = 0
         for asset in assets:
-            if asset.device_type not in assets_by_type:
-                assets_by_type[asset.device_type] = 0
             assets_by_type[asset.device_type] += 1
             total_value += float(asset.current_value)
         
-        manager = None
-        if employee.manager_id:
-            manager = db.query(Employee).filter(Employee.employee_id == employee.manager_id).first()
-        
         return {
             "employee_id": employee.employee_id,
             "employee_name": employee.full_name,
@@ -383,7 +560,7 @@ class EmployeeLifecycleTools:
             "manager_name": manager.full_name if manager else None,
             "manager_email": manager.email if manager else None,
             "total_assets": len(assets),
-            "assets_by_type": assets_by_type,
+            "assets_by_type": dict(assets_by_type),
             "total_asset_value": round(total_value, 2),
             "assets": [
                 {
@@ -413,47 +590,97 @@ class EmployeeLifecycleTools:
         Returns:
             Dictionary with assets marked for refresh
         """
-        today = datetime.now().date()
-        age_threshold_days = age_threshold_years * 365
-        
-        all_assets = db.query(Asset).all()
+        today = date.today()
+        refresh_cutoff = today - timedelta(days=age_threshold_years * 365)
+        
+        # Age in days is computed by SQLite; only assets past the cutoff are loaded
+        age_days = cast(func.julianday(today) - func.julianday(Asset.purchase_date), Integer).label("age_days")
+        rows = db.query(
+            Asset.asset_id, Asset.asset_tag, Asset.serial_number, Asset.device_type,
+            Asset.brand, Asset.model, Asset.purchase_date, age_days, Asset.purchase_value,
+            Asset.current_value, Asset.condition, Asset.assigned_to, Asset.status
+        ).filter(Asset.purchase_date < refresh_cutoff).all()
+        total_assets = db.query(func.count(Asset.asset_id)).scalar()
         
         refresh_assets = []
-        for asset in all_assets:
-            asset_age_days = (today - asset.purchase_date).days
-            
-            if asset_age_days > age_threshold_days:
-                age_years = asset_age_days / 365
-                refresh_assets.append({
-                    "asset_id": asset.asset_id,
-                    "asset_tag": asset.asset_tag,
-                    "serial_number": asset.serial_number,
-                    "device_type": asset.device_type,
-                    "brand": asset.brand,
-                    "model": asset.model,
-                    "purchase_date": asset.purchase_date.isoformat(),
-                    "age_years": round(age_years, 1),
-                    "age_days": asset_age_days,
-                    "purchase_value": float(asset.purchase_value),
-                    "current_value": float(asset.current_value),
-                    "condition": asset.condition,
-                    "assigned_to": asset.assigned_to,
-                    "status": asset.status,
-                    "refresh_status": "URGENT" if age_years > 5 else "RECOMMENDED"
-                })
+        for asset in rows:
+            age_years = asset.age_days / 365
+            refresh_assets.append({
+                "asset_id": asset.asset_id,
+                "asset_tag": asset.asset_tag,
+                "serial_number": asset.serial_number,
+                "device_type": asset.device_type,
+                "brand": asset.brand,
+                "model": asset.model,
+                "purchase_date": asset.purchase_date.isoformat(),
+                "age_years": round(age_years, 1),
+                "age_days": asset.age_days,
+                "purchase_value": float(asset.purchase_value),
+                "current_value": float(asset.current_value),
+                "condition": asset.condition,
+                "assigned_to": asset.assigned_to,
+                "status": asset.status,
+                "refresh_status": "URGENT" if age_years > 5 else "RECOMMENDED"
+            })
         
         # Sort by age (oldest first)
         refresh_assets_sorted = sorted(refresh_assets, key=lambda x: x["age_years"], reverse=True)
         
         return {
             "success": True,
-            "total_assets": len(all_assets),
+            "total_assets": total_assets,
             "refresh_count": len(refresh_assets_sorted),
             "age_threshold_years": age_threshold_years,
             "assets_for_refresh": refresh_assets_sorted,
             "total_refresh_value": round(sum(a["current_value"] for a in refresh_assets_sorted), 2)
         }
     
+    @staticmethod
+    def get_refresh_counts(db: Session, age_threshold_years: int = 3) -> Dict[str, Any]:
+        """
+        Count assets due for refresh per urgency level, aggregated in SQL
+        Uses the same rules as get_assets_for_refresh without loading the assets
+        
+        Args:
+            db: Database session
+            age_threshold_years: Age threshold in years (default 3)
+            
+        Returns:
+            Dictionary with refresh counts and values by urgency
+        """
+        today = date.today()
+        refresh_cutoff = today - timedelta(days=age_threshold_years * 365)
+        urgent_cutoff = today - timedelta(days=5 * 365)
+        
+        # Assets older than the threshold are due; older than 5 years is urgent
+        refresh_status = case(
+            (Asset.purchase_date < min(refresh_cutoff, urgent_cutoff), "URGENT"),
+            (Asset.purchase_date < refresh_cutoff, "RECOMMENDED"),
+            else_=None
+        ).label("refresh_status")
+        
+        rows = db.query(
+            refresh_status,
+            func.count(Asset.asset_id),
+            func.sum(func.round(Asset.current_value, 2))
+        ).group_by(refresh_status).all()
+        
+        by_status = {"URGENT": {"count": 0, "total_value": 0.0}, "RECOMMENDED": {"count": 0, "total_value": 0.0}}
+        total_assets = 0
+        for status, count, value in rows:
+            total_assets += count
+            if status is not None:
+                by_status[status] = {"count": count, "total_value": round(float(value or 0), 2)}
+        
+        return {
+            "success": True,
+            "total_assets": total_assets,
+            "age_threshold_years": age_threshold_years,
+            "refresh_count": by_status["URGENT"]["count"] + by_status["RECOMMENDED"]["count"],
+            "total_refresh_value": round(by_status["URGENT"]["total_value"] + by_status["RECOMMENDED"]["total_value"], 2),
+            "by_status": by_status
+        }
+    
     @staticmethod
     def get_asset_health_summary(db: Session) -> Dict[str, Any]:
         """
@@ -465,7 +692,7 @@ class EmployeeLifecycleTools:
         Returns:
             Dictionary with asset health metrics
         """
-        today = datetime.now().date()
+        today = date.today()
         all_assets = db.query(Asset).all()
         
         if not all_assets:
@@ -480,9 +707,11 @@ class EmployeeLifecycleTools:
         ages_years = [age / 365 for age in ages_days]
         
         # Categorize by age
-        new_assets = [a for a in all_assets if (today - a.purchase_date).days <= 365]
-        mid_age_assets = [a for a in all_assets if 365 < (today - a.purchase_date).days <= 3*365]
-        old_assets = [a for a in all_assets if (today - a.purchase_date).days > 3*365]
+        one_year_ago = today - timedelta(days=365)
+        three_years_ago = today - timedelta(days=3*365)
+        new_assets = [a for a in all_assets if a.purchase_date >= one_year_ago]
+        mid_age_assets = [a for a in all_assets if three_years_ago <= a.purchase_date < one_year_ago]
+        old_assets = [a for a in all_assets if a.purchase_date < three_years_ago]
         
         # Categorize by condition
         by_condition = {}
@@ -539,7 +768,7 @@ class EmployeeLifecycleTools:
         Returns:
             Dictionary with assets in age range
         """
-        today = datetime.now().date()
+        today = date.today()
         min_days = min_years * 365
         max_days = max_years * 365
         
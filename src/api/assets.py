@@ -143,12 +143,16 @@ def get_assets_for_refresh(
 
 
 @router.get("/health/report", response_model=dict)
-def get_asset_health_report(
+async def get_asset_health_report(
+    include_details: bool = Query(True),
     db: Session = Depends(get_db)
 ):
     """
     Get comprehensive asset health report with metrics and recommendations
     
+    Query Parameters:
+    - include_details: Include the lists of urgent and recommended assets (default true)
+    
     Returns:
     - Total assets count
     - Health metrics (age statistics, condition distribution, etc.)
@@ -157,7 +161,7 @@ def get_asset_health_report(
     """
     try:
         agent = get_employee_lifecycle_agent()
-        result = agent.get_asset_health_report(db)
+        result = await agent.get_asset_health_report(db, include_details=include_details)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from src.database.database import get_db
 from src.agent.asset_assignment_agent import get_employee_lifecycle_agent
 from src.agent.tool.churn_prediction_tools import ChurnPredictionTools
+from src.agent.tool.tools import invalidate_employee_assets
 from src.database.models import ConversationThread, ConversationMessage
 import uuid
 import json
@@ -399,7 +400,7 @@ def churn_chatbot(
         
         from langchain_google_genai import ChatGoogleGenerativeAI
         from src.config import settings
-        from src.agent.tool.chatbot_tools import UnifiedChatbotTools
+        from src.agent.tool.chatbot_tools import QuestionCtx, UnifiedChatbotTools
         from src.agent.tool.tools import EmployeeLifecycleTools
         from src.agent.tool.procurement_forecasting_tools import ProcurementForecastingTools
         from src.agent.asset_recovery_agent import get_asset_recovery_agent
@@ -419,18 +420,19 @@ def churn_chatbot(
         
         print(f"[Debug] Classifying with previous_question_type: {previous_question_type}")
         
-        # Classify question type with conversation context
-        question_type = UnifiedChatbotTools.classify_question_type(
-            question, 
-            previous_question_type=previous_question_type
-        )
-        
-        # Extract employee_id from question if not provided
-        if not employee_id:
-            employee_id = UnifiedChatbotTools.extract_employee_id(question)
+        # Normalize the question once for classification and extraction
+        question_ctx = QuestionCtx.from_question(question)
         
-        # Extract department if question is department-specific
-        department = UnifiedChatbotTools.extract_department(question)
+        # Classify question type with conversation context, extracting employee_id
+        # (if not provided) and department in the same call
+        analysis = UnifiedChatbotTools.analyze_question(
+            question_ctx,
+            previous_question_type=previous_question_type,
+            extract_employee_id=not employee_id
+        )
+        question_type = analysis.question_type
+        employee_id = employee_id or analysis.employee_id
+        department = analysis.department
         
         # Get context based on question type
         context_data = None
@@ -439,7 +441,7 @@ def churn_chatbot(
         if question_type == "send_recovery_email":
             # Extract employee ID
             if not employee_id:
-                employee_id = UnifiedChatbotTools.extract_employee_id(question)
+                employee_id = UnifiedChatbotTools.extract_employee_id(question_ctx)
             
             if employee_id:
                 # First check if employee has resignation date set
@@ -460,6 +462,7 @@ def churn_chatbot(
                     employee.resignation_date = date.today()
                     employee.employment_status = 'resigned'
                     db.commit()
+                    invalidate_employee_assets(employee_id)
                 
                 # Invoke asset recovery agent to send email
                 recovery_agent = get_asset_recovery_agent()
@@ -680,7 +683,7 @@ def churn_chatbot(
         role = None
         department = None
         if question_type == "assign_asset":
-            role_dept = UnifiedChatbotTools.extract_role_and_department(question)
+            role_dept = UnifiedChatbotTools.extract_role_and_department(question_ctx)
             role = role_dept.get("role")
             department = role_dept.get("department")
             
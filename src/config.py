@@ -25,6 +25,8 @@ class Settings(BaseSettings):
     smtp_password: Optional[str] = os.getenv("SMTP_PASSWORD")
     smtp_from_email: Optional[str] = os.getenv("SMTP_FROM_EMAIL")
     email_enabled: bool = os.getenv("EMAIL_ENABLED", "false").lower() == "true"
+    smtp_max_send_rate: float = 14.0  # Emails per second accepted by the relay
+    email_pool_size: int = 8  # Parallel SMTP connections for bulk sends
     
     # Company settings
     company_name: str = "Properties Management"
@@ -6,9 +6,11 @@ import os
 DATABASE_URL = "sqlite:///./src/database/properties_management.db"
 
 # Create engine
+# LIFO reuse keeps hot connections busy and lets idle overflow ones time out
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},
+    pool_use_lifo=True,
     echo=False
 )
 
@@ -62,6 +62,18 @@ def init_database():
     )
     ''')
     
+    # Partial index for assets currently assigned to an employee
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_asset_assigned_to_assigned
+    ON Asset (assigned_to) WHERE status = 'assigned'
+    ''')
+    
+    # Partial index for available stock by device type
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS ix_asset_available_type
+    ON Asset (device_type) WHERE status = 'available'
+    ''')
+    
     # HR_Analytic table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS HR_Analytic (
@@ -86,6 +98,17 @@ def init_database():
     )
     ''')
     
+    # Churn_Prediction table (cached model output per employee)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS Churn_Prediction (
+        employee_id INTEGER PRIMARY KEY,
+        feature_hash VARCHAR NOT NULL,
+        probability FLOAT NOT NULL,
+        created_at DATETIME NOT NULL,
+        FOREIGN KEY (employee_id) REFERENCES Employee(employee_id)
+    )
+    ''')
+    
     print("✓ Tables created successfully")
     
     # ===== INSERT SAMPLE DATA =====
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, Numeric, ForeignKey, CheckConstraint, Text, DateTime
+from sqlalchemy import Column, Integer, String, Date, Boolean, Numeric, Float, ForeignKey, CheckConstraint, Text, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from src.database.database import Base
 from datetime import date, datetime
@@ -54,6 +54,29 @@ class Asset(Base):
     # Relationships
     assigned_employee = relationship("Employee", back_populates="assets", foreign_keys=[assigned_to])
 
+    __table_args__ = (
+        # Partial index for "assets currently assigned to employee X" lookups;
+        # on Postgres it also covers the columns those lookups return
+        Index(
+            "ix_asset_assigned_to_assigned",
+            "assigned_to",
+            sqlite_where=text("status = 'assigned'"),
+            postgresql_where=text("status = 'assigned'"),
+            postgresql_include=[
+                "asset_tag", "device_type", "brand", "model",
+                "condition", "purchase_date", "current_value"
+            ]
+        ),
+        # Partial index for available stock by device type (inventory counts
+        # and onboarding lookups)
+        Index(
+            "ix_asset_available_type",
+            "device_type",
+            sqlite_where=text("status = 'available'"),
+            postgresql_where=text("status = 'available'")
+        ),
+    )
+
 
 class HRAnalytic(Base):
     __tablename__ = "HR_Analytic"
@@ -80,6 +103,16 @@ class HRAnalytic(Base):
     employee = relationship("Employee", back_populates="hr_analytics")
 
 
+class ChurnPrediction(Base):
+    __tablename__ = "Churn_Prediction"
+
+    # Latest cached model output per employee, valid while the feature hash matches
+    employee_id = Column(Integer, ForeignKey("Employee.employee_id"), primary_key=True)
+    feature_hash = Column(String, nullable=False)  # Model version + feature values
+    probability = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 class ConversationThread(Base):
     __tablename__ = "ConversationThread"
 
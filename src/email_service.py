@@ -3,6 +3,9 @@ Email service for sending notifications
 """
 
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
@@ -12,6 +15,36 @@ from src.config import settings
 logger = logging.getLogger(__name__)
 
 
+class _SendRateLimiter:
+    """Token bucket pacing outgoing emails to the relay's per-second limit"""
+    
+    def __init__(self, rate_per_second: float):
+        self.rate = rate_per_second
+        self.tokens = rate_per_second
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until one email may be sent"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            
+            if self.tokens < 1:
+                time.sleep((1 - self.tokens) / self.rate)
+                self.updated_at = time.monotonic()
+                self.tokens = 1
+            
+            self.tokens -= 1
+
+
+_send_rate_limiter = _SendRateLimiter(settings.smtp_max_send_rate)
+
+# Shared pool for blocking SMTP sends; each worker sends one batch over its own connection
+_EMAIL_POOL = ThreadPoolExecutor(max_workers=settings.email_pool_size, thread_name_prefix="email")
+
+
 class EmailService:
     """Service for sending emails"""
     
@@ -52,28 +85,13 @@ class EmailService:
             }
         
         try:
-            # Create message
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = settings.smtp_from_email
-            msg["To"] = to_email
-            
-            if cc_emails:
-                msg["Cc"] = ", ".join(cc_emails)
-            
-            # Attach HTML body
-            msg.attach(MIMEText(html_body, "html"))
-            
             # Send email
             with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
                 server.starttls()
                 server.login(settings.smtp_user, settings.smtp_password)
                 
-                recipients = [to_email]
-                if cc_emails:
-                    recipients.extend(cc_emails)
-                
-                server.sendmail(settings.smtp_from_email, recipients, msg.as_string())
+                _send_rate_limiter.acquire()
+                EmailService._send_message(server, to_email, subject, html_body, cc_emails)
             
             logger.info(f"Email sent to {to_email}: {subject}")
             return {
@@ -91,6 +109,106 @@ class EmailService:
                 "to": to_email
             }
     
+    @staticmethod
+    def send_many(emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send several emails in parallel batches, each over a single SMTP connection,
+        paced by the shared send rate limit
+        
+        Args:
+            emails: List of send_email keyword arguments
+                (to_email, subject, html_body, cc_emails)
+            
+        Returns:
+            List of send results, in the same order as emails
+        """
+        # Single emails, demo mode and missing credentials go through the regular path
+        if (
+            len(emails) <= 1
+            or not settings.email_enabled
+            or not settings.smtp_user or not settings.smtp_password or not settings.smtp_from_email
+        ):
+            return [EmailService.send_email(**email) for email in emails]
+        
+        # Split into one contiguous batch per worker so results keep their order
+        batch_size = -(-len(emails) // settings.email_pool_size)
+        batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+        
+        results = []
+        for batch_results in _EMAIL_POOL.map(EmailService._send_batch, batches):
+            results.extend(batch_results)
+        
+        return results
+    
+    @staticmethod
+    def _send_batch(emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send a batch of emails over one SMTP connection"""
+        results = []
+        try:
+            with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
+                server.starttls()
+                server.login(settings.smtp_user, settings.smtp_password)
+                
+                for email in emails:
+                    _send_rate_limiter.acquire()
+                    try:
+                        EmailService._send_message(server, **email)
+                        logger.info(f"Email sent to {email['to_email']}: {email['subject']}")
+                        results.append({
+                            "success": True,
+                            "message": f"Email sent successfully",
+                            "to": email["to_email"],
+                            "subject": email["subject"]
+                        })
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                        logger.error(f"Failed to send email to {email['to_email']}: {e}")
+                        results.append({
+                            "success": False,
+                            "error": str(e),
+                            "to": email["to_email"]
+                        })
+        
+        except Exception as e:
+            # Connection dropped; report the remaining emails as failed
+            logger.error(f"Failed to send email batch: {e}")
+            results.extend(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "to": email["to_email"]
+                }
+                for email in emails[len(results):]
+            )
+        
+        return results
+    
+    @staticmethod
+    def _send_message(
+        server: smtplib.SMTP,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        cc_emails: Optional[List[str]] = None
+    ) -> None:
+        """Build an HTML message and send it over an open SMTP connection"""
+        # Create message
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = settings.smtp_from_email
+        msg["To"] = to_email
+        
+        if cc_emails:
+            msg["Cc"] = ", ".join(cc_emails)
+        
+        # Attach HTML body
+        msg.attach(MIMEText(html_body, "html"))
+        
+        recipients = [to_email]
+        if cc_emails:
+            recipients.extend(cc_emails)
+        
+        server.sendmail(settings.smtp_from_email, recipients, msg.as_string())
+    
     @staticmethod
     def send_asset_return_notice(
         employee_name: str,
@@ -114,6 +232,41 @@ class EmailService:
         Returns:
             Dictionary with send results
         """
+        # Send to employee
+        return EmailService.send_email(
+            **EmailService.build_asset_return_notice(
+                employee_name=employee_name,
+                employee_email=employee_email,
+                manager_email=manager_email,
+                resignation_date=resignation_date,
+                return_due_date=return_due_date,
+                assets=assets
+            )
+        )
+    
+    @staticmethod
+    def build_asset_return_notice(
+        employee_name: str,
+        employee_email: str,
+        manager_email: Optional[str],
+        resignation_date: str,
+        return_due_date: str,
+        assets: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Build the asset return notice email without sending it
+        
+        Args:
+            employee_name: Employee name
+            employee_email: Employee email
+            manager_email: Manager email
+            resignation_date: Resignation date
+            return_due_date: Asset return due date
+            assets: List of assets to return
+            
+        Returns:
+            Dictionary of send_email keyword arguments
+        """
         
         # Build asset table
         asset_rows = ""
@@ -205,12 +358,9 @@ class EmailService:
         </html>
         """
         
-        # Send to employee
-        result_employee = EmailService.send_email(
-            to_email=employee_email,
-            subject=f"Asset Return Notice - Due by {return_due_date}",
-            html_body=html_body,
-            cc_emails=[manager_email] if manager_email else None
-        )
-        
-        return result_employee
+        return {
+            "to_email": employee_email,
+            "subject": f"Asset Return Notice - Due by {return_due_date}",
+            "html_body": html_body,
+            "cc_emails": [manager_email] if manager_email else None
+        }
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from src.database.models import Employee, Asset
 from src.schemas import EmployeeCreate, EmployeeUpdate, AssetCreate, AssetUpdate
 from src.config import settings
+from src.agent.tool.tools import invalidate_employee_assets
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
@@ -74,6 +75,7 @@ class EmployeeService:
             db_employee.tenure_months = tenure_months
 
         db.commit()
+        invalidate_employee_assets(employee_id)
         db.refresh(db_employee)
         return db_employee
 
@@ -94,6 +96,7 @@ class EmployeeService:
         
         db.delete(db_employee)
         db.commit()
+        invalidate_employee_assets(employee_id)
         return True
 
     @staticmethod
@@ -111,6 +114,7 @@ class AssetService:
         db_asset = Asset(**asset.dict())
         db.add(db_asset)
         db.commit()
+        invalidate_employee_assets(db_asset.assigned_to)
         db.refresh(db_asset)
         return db_asset
 
@@ -161,11 +165,13 @@ class AssetService:
         if not db_asset:
             return None
 
+        previous_owner = db_asset.assigned_to
         update_data = asset_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_asset, key, value)
 
         db.commit()
+        invalidate_employee_assets(previous_owner, db_asset.assigned_to)
         db.refresh(db_asset)
         return db_asset
 
@@ -175,8 +181,10 @@ class AssetService:
         db_asset = db.query(Asset).filter(Asset.asset_id == asset_id).first()
         if not db_asset:
             return False
+        previous_owner = db_asset.assigned_to
         db.delete(db_asset)
         db.commit()
+        invalidate_employee_assets(previous_owner)
         return True
 
     @staticmethod